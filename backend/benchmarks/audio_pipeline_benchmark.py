@@ -0,0 +1,176 @@
+"""Throughput benchmark for the upload audio pipeline.
+
+Synthesizes a corpus of tones and noise as WAV, MP3 and OGG at several
+lengths, then runs every file through the pipeline stages and reports
+per-stage latency, peak RSS, subprocesses spawned and files/second/core.
+
+Needs ffmpeg/ffprobe on PATH plus the audio requirements (librosa, soundfile).
+
+Usage (from backend/):
+    python benchmarks/audio_pipeline_benchmark.py
+    python benchmarks/audio_pipeline_benchmark.py --lengths 10 60 --workers 4 --repeat 2
+"""
+import argparse
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SAMPLE_RATE = 44100
+FORMATS = ["wav", "mp3", "ogg"]
+SIGNALS = ["tone", "noise"]
+
+
+def synthesize_corpus(directory, lengths):
+    import numpy as np
+    import soundfile as sf
+
+    rng = np.random.default_rng(0)
+    paths = []
+    for seconds in lengths:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        signals = {
+            # 440Hz tone pulsing at 2Hz so onset/BPM detection has something to find
+            "tone": 0.5 * np.sin(2 * np.pi * 440 * t) * (np.sin(2 * np.pi * 2 * t) > 0),
+            "noise": 0.3 * rng.standard_normal(len(t)),
+        }
+        for name in SIGNALS:
+            wav_path = os.path.join(directory, f"{name}_{seconds}s.wav")
+            sf.write(wav_path, signals[name].astype("float32"), SAMPLE_RATE)
+            for fmt in FORMATS:
+                path = os.path.join(directory, f"{name}_{seconds}s.{fmt}")
+                if fmt != "wav":
+                    subprocess.run(
+                        ["ffmpeg", "-loglevel", "error", "-y", "-i", wav_path, path],
+                        check=True
+                    )
+                paths.append(path)
+    return paths
+
+
+class CountingPopen(subprocess.Popen):
+    count = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingPopen.count += 1
+        super().__init__(*args, **kwargs)
+
+
+def run_file(path):
+    """Run one file through every stage; returns (stage timings, subprocess count)."""
+    from werkzeug.datastructures import FileStorage
+    from main.common import audio_preview_generator as apg
+
+    subprocess.Popen = CountingPopen
+    before = CountingPopen.count
+    timings = {}
+
+    def timed(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    with open(path, "rb") as f:
+        upload = FileStorage(f, filename=os.path.basename(path))
+        input_path, preview_path, _, _ = timed("preview (tempfile)", lambda: apg.generate_30s_preview(upload))
+    for p in (input_path, preview_path):
+        if p and os.path.exists(p):
+            os.remove(p)
+
+    with open(path, "rb") as f:
+        upload = FileStorage(f, filename=os.path.basename(path))
+        source, preview, _, _ = timed("preview (pipe)", lambda: apg.generate_30s_preview_piped(upload))
+    for stream in (source, preview):
+        if stream is not None:
+            stream.close()
+
+    timed("detect_bpm", lambda: apg.detect_bpm(path))
+    timed("detect_audio_format", lambda: apg.detect_audio_format(path))
+    timed("detect_audio_duration", lambda: apg.detect_audio_duration(path))
+
+    return timings, CountingPopen.count - before
+
+
+def peak_rss_mb():
+    # ffmpeg children are not included: on Linux their ru_maxrss also counts
+    # the Python image they were forked from, which makes the number meaningless
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(paths):
+    results = [run_file(p) for p in paths]
+    return results, peak_rss_mb()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", nargs="+", type=int, default=[15, 60, 180],
+                        help="track lengths in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (one core each)")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus")
+    parser.add_argument("--keep-corpus", action="store_true")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("ffmpeg and ffprobe must be on PATH")
+
+    corpus_dir = tempfile.mkdtemp(prefix="audio_bench_")
+    try:
+        paths = synthesize_corpus(corpus_dir, args.lengths) * args.repeat
+        print(f"corpus: {len(paths) // args.repeat} files in {corpus_dir}, {args.repeat} pass(es), {args.workers} worker(s)")
+
+        # Warm-up so the one-off librosa/numba import isn't billed to the first file
+        run_file(paths[0])
+
+        chunks = [paths[i::args.workers] for i in range(args.workers)]
+        start = time.perf_counter()
+        if args.workers == 1:
+            worker_results = [run_worker(chunks[0])]
+        else:
+            with Pool(args.workers) as pool:
+                worker_results = pool.map(run_worker, chunks)
+        elapsed = time.perf_counter() - start
+    finally:
+        if not args.keep_corpus:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    stages = {}
+    subprocesses = []
+    for results, _ in worker_results:
+        for timings, spawned in results:
+            subprocesses.append(spawned)
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+
+    print(f"\n{'stage':<24} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for stage, values in stages.items():
+        print(
+            f"{stage:<24} {statistics.mean(values) * 1000:>9.1f} {percentile(values, 50) * 1000:>9.1f} "
+            f"{percentile(values, 95) * 1000:>9.1f} {max(values) * 1000:>9.1f}"
+        )
+
+    peak_rss = max(rss for _, rss in worker_results)
+    files = len(subprocesses)
+    print(f"\nfiles processed:        {files}")
+    print(f"wall time:              {elapsed:.2f}s")
+    print(f"files/s/core:           {files / elapsed / args.workers:.3f}")
+    print(f"uploads/min (all cores): {files / elapsed * 60:.1f}")
+    print(f"subprocesses per file:  {statistics.mean(subprocesses):.1f} (total {sum(subprocesses)})")
+    print(f"peak RSS per worker:    {peak_rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
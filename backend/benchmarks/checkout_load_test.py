@@ -0,0 +1,172 @@
+"""Checkout-to-paid load test against the in-process fake payment provider.
+
+Seeds sellers, products and one cart per simulated buyer, then drives every
+buyer through POST /buyer/checkout, pays each returned session on the fake
+provider and delivers the signed checkout.session.completed event to
+POST /stripe/webhook, all through the Flask test client from a thread pool.
+The webhook only stores the event, so the run then waits for the in-process
+consumer to apply them. Reports checkout/webhook latency, the consumer's
+drain time, completed orders per minute and what the injected failures did.
+
+Set DATABASE_URL to run against MySQL/Postgres instead of a throwaway SQLite
+file (which serializes writers, so it understates throughput).
+
+Usage (from backend/):
+    python benchmarks/checkout_load_test.py
+    python benchmarks/checkout_load_test.py --buyers 2000 --threads 32 --latency 0.05 --failure-rate 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def seed(db, buyers, sellers, items_per_cart):
+    from main.database.models import User, Product, CartItem
+
+    stamp = time.time_ns()
+    seller_rows = [
+        User(name=f"seller{i}", email=f"seller{i}-{stamp}@example.com", password_hash="x",
+             role="seller", is_approved=True, stripe_account_id=f"acct_fake_{i}")
+        for i in range(sellers)
+    ]
+    db.session.add_all(seller_rows)
+    db.session.flush()
+    products = [
+        Product(title=f"Track {i}", description="", price=4.99 + i % 5, seller_id=seller_rows[i % sellers].id,
+                file_url=f"https://example.com/{i}.mp3")
+        for i in range(sellers * 4)
+    ]
+    buyer_rows = [
+        User(name=f"buyer{i}", email=f"buyer{i}-{stamp}@example.com", password_hash="x", role="buyer")
+        for i in range(buyers)
+    ]
+    db.session.add_all(products + buyer_rows)
+    db.session.flush()
+    db.session.add_all([
+        CartItem(buyer_id=buyer.id, product_id=products[(b + k) % len(products)].id)
+        for b, buyer in enumerate(buyer_rows) for k in range(items_per_cart)
+    ])
+    db.session.commit()
+    return [buyer.id for buyer in buyer_rows]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=500, help="buyers, each checking out once")
+    parser.add_argument("--sellers", type=int, default=8)
+    parser.add_argument("--items", type=int, default=3, help="cart items per buyer")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake provider latency per call, seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fake provider failure probability")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="seconds to wait for the webhook consumer")
+    args = parser.parse_args()
+
+    db_file = None
+    if not os.environ.get("DATABASE_URL"):
+        fd, db_file = tempfile.mkstemp(prefix="checkout_load_", suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}?timeout=60"
+    os.environ["PAYMENT_PROVIDER"] = "fake"
+    os.environ["FAKE_PAYMENT_LATENCY"] = str(args.latency)
+    os.environ["FAKE_PAYMENT_FAILURE_RATE"] = str(args.failure_rate)
+    os.environ["WEBHOOK_CONSUMER"] = "thread"
+
+    from main import create_app
+    from main.extension import db
+    from main.common.jwt_utils import generate_token
+    from main.database.models import Order
+    from main.common.stripe.webhook_events import event_counts
+
+    try:
+        app = create_app()
+        with app.app_context():
+            buyer_ids = seed(db, args.buyers, args.sellers, args.items)
+        fake = app.extensions["payments"]
+
+        lock = threading.Lock()
+        checkout_times, webhook_times = [], []
+        outcome = {"sessions": 0, "failed_sellers": 0, "checkout_errors": 0, "webhook_errors": 0}
+        local = threading.local()
+
+        def run_buyer(buyer_id):
+            client = getattr(local, "client", None) or app.test_client()
+            local.client = client
+            headers = {"Authorization": f"Bearer {generate_token(buyer_id, 'buyer')}"}
+
+            start = time.perf_counter()
+            response = client.post("/buyer/checkout", headers=headers, json={})
+            elapsed = time.perf_counter() - start
+            body = response.get_json() or {}
+            with lock:
+                checkout_times.append(elapsed)
+                outcome["failed_sellers"] += len(body.get("failed", []))
+                if response.status_code != 200:
+                    outcome["checkout_errors"] += 1
+                    return
+
+            for session in body["sessions"]:
+                session_id = session["checkout_url"].rsplit("/", 1)[-1]
+                payload, signature = fake.complete_checkout_session(session_id)
+                start = time.perf_counter()
+                response = client.post("/stripe/webhook", data=payload,
+                                       headers={"Stripe-Signature": signature, "Content-Type": "application/json"})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    webhook_times.append(elapsed)
+                    outcome["sessions"] += 1
+                    if response.status_code != 200:
+                        outcome["webhook_errors"] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(run_buyer, buyer_ids))
+        requests_done = time.perf_counter()
+
+        # Acknowledged events are applied by the consumer thread; wait for the backlog to empty
+        with app.app_context():
+            while time.perf_counter() - requests_done < args.drain_timeout:
+                counts = event_counts()
+                db.session.remove()
+                if not counts.get("pending") and not counts.get("processing"):
+                    break
+                time.sleep(0.05)
+        wall = time.perf_counter() - started
+        drain = wall - (requests_done - started)
+
+        with app.app_context():
+            paid = Order.query.filter_by(status="paid").count()
+            pending = Order.query.filter_by(status="pending").count()
+            counts = event_counts()
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+    print(f"{args.buyers} buyers x {args.items} items over {args.sellers} sellers, {args.threads} threads, "
+          f"provider latency {args.latency * 1000:.0f}ms, failure rate {args.failure_rate:.1%}")
+    for name, values in (("checkout", checkout_times), ("webhook", webhook_times)):
+        if values:
+            print(f"{name:<9} n={len(values):<6} mean {statistics.mean(values) * 1000:7.1f}ms  "
+                  f"p50 {percentile(values, 50) * 1000:7.1f}ms  p95 {percentile(values, 95) * 1000:7.1f}ms")
+    print(f"wall time:            {wall:.2f}s (consumer drain after last request {drain:.2f}s)")
+    print(f"orders paid:          {paid} ({paid / wall * 60:.0f}/min)")
+    print(f"orders left pending:  {pending}")
+    print(f"webhook events:       {counts}")
+    print(f"provider calls:       {fake.stats()}")
+    print(f"failed seller sessions {outcome['failed_sellers']}, checkout errors {outcome['checkout_errors']}, "
+          f"webhook errors {outcome['webhook_errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Checkout pricing benchmark: per-item queries vs the set-based pricing engine.
+
+Seeds a throwaway database with sellers, products and coupons, then prices
+1-, 10- and 100-item carts both the old way (a product, seller and coupon
+query per item) and with main.common.pricing.price_cart, and reports SQL
+queries and latency per cart. Also times signing and verifying the quote
+that checkout consumes instead of re-pricing.
+
+Set DATABASE_URL to benchmark against MySQL/Postgres instead of SQLite.
+
+Usage (from backend/):
+    python benchmarks/checkout_pricing_benchmark.py
+    python benchmarks/checkout_pricing_benchmark.py --sizes 1 10 100 500 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SELLERS = 8
+
+
+def seed(db, size):
+    from main.database.models import User, Product, CartItem, Coupon
+
+    stamp = time.time_ns()
+    sellers = [
+        User(name=f"seller{i}", email=f"seller{i}-{stamp}@example.com", password_hash="x",
+             role="seller", is_approved=True, stripe_account_id=f"acct_{i}")
+        for i in range(SELLERS)
+    ]
+    buyer = User(name="buyer", email=f"buyer-{stamp}@example.com", password_hash="x", role="buyer")
+    db.session.add_all(sellers + [buyer])
+    db.session.flush()
+
+    coupons = {}
+    for i in range(size):
+        product = Product(title=f"Track {i}", description="", price=9.99 + i % 7,
+                          seller_id=sellers[i % SELLERS].id, file_url=f"https://example.com/{i}.mp3")
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(CartItem(buyer_id=buyer.id, product_id=product.id))
+        if i % 2 == 0:
+            code = f"C{stamp}-{i}"
+            db.session.add(Coupon(code=code, discount_percent=15, product_id=product.id,
+                                  valid_until=datetime.utcnow() + timedelta(days=1)))
+            coupons[str(product.id)] = code
+    db.session.commit()
+    return buyer.id, coupons
+
+
+def legacy_price(user_id, coupons):
+    """The pricing loop CheckoutResource used to run, minus the Stripe calls."""
+    from collections import defaultdict
+    from main.database.models import CartItem, Product, Coupon, User
+
+    seller_cart = defaultdict(list)
+    for item in CartItem.query.filter_by(buyer_id=user_id).all():
+        product = Product.query.get(item.product_id)
+        if product and not product.is_deleted:
+            seller_cart[product.seller_id].append(product)
+
+    totals = {}
+    for seller_id, products in seller_cart.items():
+        seller = User.query.get(seller_id)
+        if not seller or not seller.stripe_account_id:
+            continue
+        total = 0
+        for product in products:
+            price = product.price
+            code = coupons.get(str(product.id))
+            if code:
+                coupon = Coupon.query.filter_by(code=code, product_id=product.id).first()
+                if coupon and coupon.is_valid():
+                    price *= (1 - coupon.discount_percent / 100)
+            total += round(price, 2)
+        totals[seller_id] = round(total, 2)
+    return totals
+
+
+def measure(db, fn, repeat):
+    from sqlalchemy import event
+
+    counter = {"n": 0}
+
+    def count(*_):
+        counter["n"] += 1
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        timings = []
+        for _ in range(repeat):
+            db.session.expunge_all()  # don't let the identity map hide per-item queries
+            counter["n"] = 0
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+            queries = counter["n"]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return queries, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 100], help="cart sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    args = parser.parse_args()
+
+    db_file = None
+    if not os.environ.get("DATABASE_URL"):
+        fd, db_file = tempfile.mkstemp(prefix="pricing_bench_", suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+    from main import create_app
+    from main.extension import db
+    from main.common.pricing import price_cart, sign_quote, load_quote
+
+    try:
+        app = create_app()
+        print(f"{'items':>6} {'engine':<8} {'queries':>8} {'mean ms':>9} {'p95 ms':>9}")
+        with app.test_request_context():
+            for size in args.sizes:
+                user_id, coupons = seed(db, size)
+
+                legacy = legacy_price(user_id, coupons)
+                quote = price_cart(user_id, coupons)
+                engine_totals = {g["seller_id"]: g["total_cents"] / 100 for g in quote["sellers"]}
+                drift = max(abs(legacy[s] - engine_totals[s]) for s in legacy)
+
+                rows = [
+                    ("legacy", measure(db, lambda: legacy_price(user_id, coupons), args.repeat)),
+                    ("set", measure(db, lambda: price_cart(user_id, coupons), args.repeat)),
+                ]
+                token = sign_quote(quote)
+                rows.append(("quote", measure(db, lambda: load_quote(token, user_id), args.repeat)))
+
+                for name, (queries, timings) in rows:
+                    p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+                    print(f"{size:>6} {name:<8} {queries:>8} {statistics.mean(timings) * 1000:>9.2f} {p95 * 1000:>9.2f}")
+                print(f"{'':>6} max per-seller total drift vs legacy float math: ${drift:.2f}")
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Concurrency stress test for the per-item download limit.
+
+Seeds one paid order item, then fires many concurrent download requests at
+it and checks that exactly MAX_DOWNLOADS_PER_PRODUCT of them succeed, that
+order_items.download_count equals the limit and that DownloadHistory has
+one audit row per successful download.
+
+Uses signed delivery so no file is fetched; set DATABASE_URL to run it
+against MySQL/Postgres instead of the default throwaway SQLite file.
+
+Usage (from backend/):
+    python benchmarks/download_limit_stress.py
+    python benchmarks/download_limit_stress.py --requests 200 --threads 32
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def seed(app):
+    from main.database.models import db, User, Product, Order, OrderItem
+
+    with app.app_context():
+        db.create_all()
+        seller = User(name="seller", email=f"seller-{time.time_ns()}@example.com", password_hash="x",
+                      role="seller", is_approved=True)
+        buyer = User(name="buyer", email=f"buyer-{time.time_ns()}@example.com", password_hash="x", role="buyer")
+        db.session.add_all([seller, buyer])
+        db.session.flush()
+        product = Product(title="Stress", description="", price=1, seller_id=seller.id,
+                          file_url="https://example.com/stress.mp3")
+        db.session.add(product)
+        db.session.flush()
+        order = Order(buyer_id=buyer.id, total_price=1, payment_method="stripe", status="paid")
+        db.session.add(order)
+        db.session.flush()
+        item = OrderItem(order_id=order.id, product_id=product.id, seller_id=product.seller_id, price=1)
+        db.session.add(item)
+        db.session.commit()
+        return buyer.id, item.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="download attempts in total")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent clients")
+    args = parser.parse_args()
+
+    db_file = None
+    if not os.environ.get("DATABASE_URL"):
+        fd, db_file = tempfile.mkstemp(prefix="download_stress_", suffix=".db")
+        os.close(fd)
+        # busy timeout so concurrent writers queue on SQLite's lock instead of failing
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}?timeout=30"
+    os.environ["DOWNLOAD_DELIVERY"] = "signed"
+    os.environ.setdefault("DOWNLOAD_SIGNING_KEY", "stress-test-key")
+    os.environ.setdefault("DOWNLOAD_URL_BASE", "https://downloads.example.com")
+
+    from main import create_app
+    from main.common.jwt_utils import generate_token
+    from main.database.models import db, OrderItem, DownloadHistory
+    from main.v1.buyer.dashboard.downloads.download_resource import MAX_DOWNLOADS_PER_PRODUCT
+
+    try:
+        app = create_app()
+        buyer_id, item_id = seed(app)
+        headers = {"Authorization": f"Bearer {generate_token(buyer_id, 'buyer')}"}
+        url = f"/buyer/download/{item_id}"
+
+        start_gate = threading.Barrier(args.threads)
+        local = threading.local()
+
+        def attempt(_):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = app.test_client()
+                start_gate.wait()  # release all clients at once
+            return client.get(url, headers=headers).status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            statuses = Counter(pool.map(attempt, range(max(args.requests, args.threads))))
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            counter = db.session.get(OrderItem, item_id).download_count
+            history = DownloadHistory.query.filter_by(order_item_id=item_id).count()
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+    total = sum(statuses.values())
+    print(f"{total} requests over {args.threads} threads in {elapsed:.2f}s")
+    print(f"status codes:     {dict(sorted(statuses.items()))}")
+    print(f"limit:            {MAX_DOWNLOADS_PER_PRODUCT}")
+    print(f"download_count:   {counter}")
+    print(f"history rows:     {history}")
+
+    ok = statuses[200] == counter == history == MAX_DOWNLOADS_PER_PRODUCT
+    print("PASS" if ok else "FAIL: limit was not enforced exactly")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
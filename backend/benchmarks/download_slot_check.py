@@ -0,0 +1,170 @@
+"""Check that download stream slots are given back after every response.
+
+Seeds a buyer with locally stored purchases and makes more sequential
+downloads than DOWNLOAD_MAX_STREAMS_PER_USER and DOWNLOAD_MAX_STREAMS allow
+at once, by calling the app's WSGI callable directly the way a server does:
+the body is iterated (or not) and then closed. Every download should get a
+200 and the scheduler should end with no active streams.
+
+Each scenario runs with and without a bandwidth budget, and with the server
+supplying its own wsgi.file_wrapper as gunicorn does:
+    read     the whole body is sent
+    unread   the body is closed before it is iterated (client went away)
+    head     HEAD request
+    bundle   ZIP bundle of two items
+
+Usage (from backend/):
+    python benchmarks/download_slot_check.py
+"""
+import argparse
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class ServerFileWrapper:
+    """Stand-in for gunicorn's wsgi.file_wrapper: close is an instance attribute."""
+
+    def __init__(self, filelike, blksize=8192):
+        self.filelike = filelike
+        self.blksize = blksize
+        if hasattr(filelike, "close"):
+            self.close = filelike.close
+
+    def __iter__(self):
+        while True:
+            data = self.filelike.read(self.blksize)
+            if not data:
+                return
+            yield data
+
+
+def seed(app, items):
+    from main.database.models import db, User, Product, Order, OrderItem
+    from main.common.storage import save_local
+
+    with app.app_context():
+        db.create_all()
+        seller = User(name="seller", email=f"seller-{time.time_ns()}@example.com", password_hash="x",
+                      role="seller", is_approved=True)
+        buyer = User(name="buyer", email=f"buyer-{time.time_ns()}@example.com", password_hash="x", role="buyer")
+        db.session.add_all([seller, buyer])
+        db.session.flush()
+
+        fd, source = tempfile.mkstemp(suffix=".mp3")
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(256 * 1024))
+        order = Order(buyer_id=buyer.id, total_price=items, payment_method="stripe", status="paid")
+        db.session.add(order)
+        db.session.flush()
+        item_ids = []
+        for n in range(items):
+            product = Product(title=f"Track {n}", description="", price=1, seller_id=seller.id,
+                              file_url=save_local(source, folder="products"))
+            db.session.add(product)
+            db.session.flush()
+            item = OrderItem(order_id=order.id, product_id=product.id, seller_id=seller.id, price=1)
+            db.session.add(item)
+            db.session.flush()
+            item_ids.append(item.id)
+        db.session.commit()
+        os.remove(source)
+        return buyer.id, item_ids
+
+
+def call(app, path, headers, method="GET", read=True, file_wrapper=None):
+    """Run one request through app's WSGI callable; returns the status code."""
+    from werkzeug.test import EnvironBuilder
+
+    environ = EnvironBuilder(path=path, method=method, headers=headers).get_environ()
+    if file_wrapper is not None:
+        environ["wsgi.file_wrapper"] = file_wrapper
+    status = []
+    body = app(environ, lambda s, h, exc_info=None: status.append(s))
+    try:
+        if read:
+            for _ in body:
+                pass
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-streams", type=int, default=2, help="DOWNLOAD_MAX_STREAMS for the check")
+    parser.add_argument("--per-user", type=int, default=2, help="DOWNLOAD_MAX_STREAMS_PER_USER for the check")
+    args = parser.parse_args()
+
+    storage_root = tempfile.mkdtemp(prefix="download_slots_")
+    fd, db_file = tempfile.mkstemp(prefix="download_slots_", suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    for background in ("WEBHOOK_CONSUMER", "OUTBOX_RELAY", "ORDER_SWEEPER"):
+        os.environ[background] = "off"
+
+    from main import create_app
+    from main.common.jwt_utils import generate_token
+    from main.common.download_scheduler import app_scheduler
+    from main.v1.buyer.dashboard.downloads.download_resource import MAX_DOWNLOADS_PER_PRODUCT
+
+    failures = []
+    try:
+        app = create_app()
+        app.config.update(
+            STORAGE_BACKEND="local",
+            STORAGE_ROOT=storage_root,
+            DOWNLOAD_MAX_STREAMS=args.max_streams,
+            DOWNLOAD_MAX_STREAMS_PER_USER=args.per_user,
+            DOWNLOAD_QUEUE_TIMEOUT=0,
+        )
+        # Enough downloads per scenario to run past both caps, spread over items so
+        # the per-item download limit isn't what stops them
+        downloads = max(args.max_streams, args.per_user) + 1
+        scenarios = [
+            ("read", "GET", True, False),
+            ("unread", "GET", False, False),
+            ("head", "HEAD", False, False),
+            ("bundle", "GET", True, True),
+        ]
+        runs = [(bandwidth, wrapper) for bandwidth in (0, 10 * 1024 * 1024) for wrapper in (None, ServerFileWrapper)]
+        per_item = MAX_DOWNLOADS_PER_PRODUCT
+        needed = sum(downloads * (2 if bundle else 1) for *_, bundle in scenarios) * len(runs)
+        buyer_id, item_ids = seed(app, -(-needed // per_item))
+        headers = {"Authorization": f"Bearer {generate_token(buyer_id, 'buyer')}"}
+        free = [item_id for item_id in item_ids for _ in range(per_item)]
+
+        for bandwidth, wrapper in runs:
+            app.config["DOWNLOAD_BANDWIDTH_BYTES"] = bandwidth
+            app.extensions.pop("download_scheduler", None)
+            for name, method, read, bundle in scenarios:
+                statuses = []
+                for _ in range(downloads):
+                    if bundle:
+                        ids = f"{free.pop()},{free.pop()}"
+                        path = f"/buyer/downloads/bundle?order_item_ids={ids}"
+                    else:
+                        path = f"/buyer/download/{free.pop()}"
+                    statuses.append(call(app, path, headers, method=method, read=read, file_wrapper=wrapper))
+                with app.app_context():
+                    active = app_scheduler().stats()["active"]
+                label = f"{name:<7} bandwidth={bandwidth:<9} file_wrapper={'server' if wrapper else 'default':<8}"
+                ok = all(status == 200 for status in statuses) and active == 0
+                print(f"{label} statuses={statuses} active={active} {'ok' if ok else 'LEAK'}")
+                if not ok:
+                    failures.append(label)
+    finally:
+        os.remove(db_file)
+        shutil.rmtree(storage_root, ignore_errors=True)
+
+    print("PASS" if not failures else f"FAIL: {len(failures)} scenario(s) left slots held")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
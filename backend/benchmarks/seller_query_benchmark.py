@@ -0,0 +1,226 @@
+"""Seller query benchmark: joining through products vs order_items.seller_id.
+
+Seeds a throwaway database with sellers, products, buyers and paid orders,
+then runs each seller-facing query both the old way (order_items joined to
+products to filter on products.seller_id) and on the denormalized
+order_items.seller_id column with its (seller_id, order_id) and
+(seller_id, product_id) indexes. Reports SQL queries and latency per call
+for one seller, and checks both forms return the same rows.
+
+Set DATABASE_URL to benchmark against MySQL/Postgres instead of SQLite.
+
+Usage (from backend/):
+    python benchmarks/seller_query_benchmark.py
+    python benchmarks/seller_query_benchmark.py --sellers 200 --orders 100000 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def seed(db, sellers, products_per_seller, buyers, orders, items_per_order):
+    from main.database.models import User, Product, Order, OrderItem
+
+    stamp = time.time_ns()
+    rng = random.Random(42)
+    db.session.execute(User.__table__.insert(), [
+        {"name": f"seller{i}", "email": f"seller{i}-{stamp}@example.com", "password_hash": "x",
+         "role": "seller", "is_approved": True}
+        for i in range(sellers)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {"name": f"buyer{i}", "email": f"buyer{i}-{stamp}@example.com", "password_hash": "x",
+         "role": "buyer", "is_approved": False}
+        for i in range(buyers)
+    ])
+    seller_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like(f"seller%-{stamp}@example.com"))]
+    buyer_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like(f"buyer%-{stamp}@example.com"))]
+
+    db.session.execute(Product.__table__.insert(), [
+        {"title": f"Track {s}-{p}", "description": "", "price": 4.99 + p % 5, "seller_id": seller_id,
+         "file_url": f"https://example.com/{s}-{p}.mp3", "is_deleted": False}
+        for s, seller_id in enumerate(seller_ids) for p in range(products_per_seller)
+    ])
+    products = db.session.query(Product.id, Product.seller_id, Product.price).filter(
+        Product.seller_id.in_(seller_ids)).all()
+
+    start = datetime.utcnow() - timedelta(days=365)
+    db.session.execute(Order.__table__.insert(), [
+        {"buyer_id": rng.choice(buyer_ids), "total_price": 0, "payment_method": "stripe",
+         "status": "paid" if i % 10 else "pending", "created_at": start + timedelta(minutes=i)}
+        for i in range(orders)
+    ])
+    order_ids = [oid for (oid,) in db.session.query(Order.id).filter(Order.buyer_id.in_(buyer_ids))]
+
+    batch = []
+    for order_id in order_ids:
+        for product_id, seller_id, price in rng.sample(products, items_per_order):
+            batch.append({"order_id": order_id, "product_id": product_id, "seller_id": seller_id,
+                          "quantity": 1, "price": price, "download_count": 0})
+        if len(batch) >= 10000:
+            db.session.execute(OrderItem.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(OrderItem.__table__.insert(), batch)
+    db.session.commit()
+    return seller_ids, order_ids
+
+
+def seller_queries(db, seller_id, product_id, order_id):
+    """(name, old, new) pairs; each callable returns comparable rows."""
+    from sqlalchemy import func
+    from main.database.models import Product, Order, OrderItem
+
+    def totals(via_products):
+        query = (
+            db.session.query(func.sum(OrderItem.price * OrderItem.quantity), func.sum(OrderItem.quantity))
+            .join(Product, Product.id == OrderItem.product_id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(Product.is_deleted == False, Order.status == "paid")
+        )
+        column = Product.seller_id if via_products else OrderItem.seller_id
+        row = query.filter(column == seller_id).first()
+        return [(round(row[0] or 0, 2), row[1])]
+
+    def sales_report(via_products):
+        query = (
+            db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity), func.sum(OrderItem.price))
+            .join(Product, Product.id == OrderItem.product_id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(Product.is_deleted == False, Order.status == "paid")
+            .group_by(OrderItem.product_id)
+            .order_by(func.sum(OrderItem.quantity).desc(), OrderItem.product_id)
+        )
+        column = Product.seller_id if via_products else OrderItem.seller_id
+        return query.filter(column == seller_id).limit(10).all()
+
+    def product_sales(via_products):
+        query = (
+            db.session.query(func.sum(OrderItem.quantity), func.sum(OrderItem.price))
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(OrderItem.product_id == product_id, Order.status == "paid")
+        )
+        if via_products:
+            query = query.join(Product, Product.id == OrderItem.product_id).filter(Product.seller_id == seller_id)
+        else:
+            query = query.filter(OrderItem.seller_id == seller_id)
+        return query.all()
+
+    def orders_page(via_products):
+        query = (
+            db.session.query(Order.id, Order.created_at, func.sum(OrderItem.price))
+            .select_from(OrderItem)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(Order.status == "paid")
+            .group_by(Order.id, Order.created_at)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+        )
+        if via_products:
+            query = query.join(Product, Product.id == OrderItem.product_id).filter(Product.seller_id == seller_id)
+        else:
+            query = query.filter(OrderItem.seller_id == seller_id)
+        return query.limit(20).all()
+
+    def payouts(via_products):
+        order = db.session.get(Order, order_id)
+        earnings = {}
+        for item in order.items:
+            if via_products:
+                seller = db.session.get(Product, item.product_id).seller_id
+            else:
+                seller = item.seller_id
+            earnings[seller] = round(earnings.get(seller, 0) + item.price, 2)
+        return sorted(earnings.items())
+
+    return [
+        ("dashboard totals", lambda: totals(True), lambda: totals(False)),
+        ("sales report page", lambda: sales_report(True), lambda: sales_report(False)),
+        ("product sales", lambda: product_sales(True), lambda: product_sales(False)),
+        ("orders page", lambda: orders_page(True), lambda: orders_page(False)),
+        ("order payouts", lambda: payouts(True), lambda: payouts(False)),
+    ]
+
+
+def measure(db, fn, repeat):
+    from sqlalchemy import event
+
+    counter = {"n": 0}
+
+    def count(*_):
+        counter["n"] += 1
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        timings = []
+        for _ in range(repeat):
+            db.session.expunge_all()  # don't let the identity map hide per-item queries
+            counter["n"] = 0
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+            queries = counter["n"]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return queries, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--products", type=int, default=40, help="products per seller")
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=3, help="items per order")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    args = parser.parse_args()
+
+    db_file = None
+    if not os.environ.get("DATABASE_URL"):
+        fd, db_file = tempfile.mkstemp(prefix="seller_bench_", suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    for background in ("WEBHOOK_CONSUMER", "OUTBOX_RELAY", "ORDER_SWEEPER"):
+        os.environ[background] = "off"
+
+    from main import create_app
+    from main.extension import db
+    from main.database.models import OrderItem
+
+    try:
+        app = create_app()
+        with app.app_context():
+            started = time.perf_counter()
+            seller_ids, order_ids = seed(db, args.sellers, args.products, args.buyers, args.orders, args.items)
+            print(f"seeded {args.sellers} sellers x {args.products} products, {len(order_ids)} orders x "
+                  f"{args.items} items in {time.perf_counter() - started:.1f}s")
+
+            seller_id = seller_ids[len(seller_ids) // 2]
+            product_id, order_id = (
+                db.session.query(OrderItem.product_id, OrderItem.order_id)
+                .filter(OrderItem.seller_id == seller_id).first()
+            )
+
+            print(f"{'query':<18} {'form':<9} {'queries':>8} {'mean ms':>9} {'p95 ms':>9}")
+            for name, old, new in seller_queries(db, seller_id, product_id, order_id):
+                if old() != new():
+                    print(f"{name}: results differ!")
+                for form, fn in (("products", old), ("seller_id", new)):
+                    queries, timings = measure(db, fn, args.repeat)
+                    p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+                    print(f"{name:<18} {form:<9} {queries:>8} {statistics.mean(timings) * 1000:>9.2f} "
+                          f"{p95 * 1000:>9.2f}")
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measure import time and memory of create_app() for each app profile.
+
+Each profile is measured in a fresh interpreter so module caches from one run
+don't hide the cost of the next.
+
+Usage (from backend/):
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --profiles full api --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY_MODULES = ["librosa", "numpy", "ffmpeg", "reportlab", "stripe", "cloudinary"]
+
+# Runs inside the child interpreter and prints one JSON line
+CHILD_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from main import create_app
+imported = time.perf_counter()
+app = create_app(profile=sys.argv[1])
+created = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "create_app_s": created - imported,
+    "total_s": created - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "routes": len(list(app.url_map.iter_rules())),
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once(profile, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, profile],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["full", "api"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="DB used by create_app() (defaults to in-memory SQLite)")
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'import s':>9} {'create s':>9} {'total s':>9} {'RSS MB':>8} {'routes':>7}  heavy modules loaded")
+    for profile in args.profiles:
+        results = [run_once(profile, args.database_url) for _ in range(args.runs)]
+        best = min(results, key=lambda r: r["total_s"])
+        print(
+            f"{profile:<8} {best['import_s']:>9.3f} {best['create_app_s']:>9.3f} {best['total_s']:>9.3f} "
+            f"{best['max_rss_mb']:>8.1f} {best['routes']:>7}  {', '.join(best['loaded']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import click
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -7,25 +8,50 @@ from main.config.config import Config
 from main.extension import init_extensions
 from main.config.routes import register_routes
 from main.common.cloudinary_helper import init_cloudinary
+from main.common.http_client import init_http_client
+from main.common.payments import init_payments
+from main.common.wav_compaction import compact_wav_command
+from main.common.stripe.webhook_events import process_webhooks_command, start_webhook_consumer
+from main.common.outbox import relay_outbox_command, start_outbox_relay
+from main.common.order_expiry import expire_orders_command, start_order_sweeper
+from main.common.invoices import render_invoices_command  # also registers its outbox subscribers
 
 load_dotenv()  
 
-def create_app():
+def create_app(profile=None):
     app = Flask(__name__, static_folder=None)  # Disable default static folder
     
     app.config.from_object(Config)
+    if profile:
+        app.config["APP_PROFILE"] = profile
 
     CORS(app)
 
     init_extensions(app)
     init_cloudinary(app)  
+    init_http_client(app)
+    init_payments(app)
 
     register_routes(app)
+    app.cli.add_command(compact_wav_command)
+    app.cli.add_command(process_webhooks_command)
+    app.cli.add_command(relay_outbox_command)
+    app.cli.add_command(expire_orders_command)
+    app.cli.add_command(render_invoices_command)
 
     # Create DB tables
     with app.app_context():
         db.create_all()
 
+    # `flask db upgrade` and the other commands load the app too; they get no background jobs
+    if click.get_current_context(silent=True) is None:
+        if app.config["WEBHOOK_CONSUMER"] == "thread":
+            start_webhook_consumer(app)
+        if app.config["OUTBOX_RELAY"] == "thread":
+            start_outbox_relay(app)
+        if app.config["ORDER_SWEEPER"] == "thread":
+            start_order_sweeper(app)
+
     # --- React static files config ---
 
     # Absolute path to your React build folder
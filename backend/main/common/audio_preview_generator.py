@@ -1,11 +1,29 @@
+import io
 import os
+import json
+import shutil
 import tempfile
+import threading
+import subprocess
 from werkzeug.datastructures import FileStorage
-import librosa
-import numpy as np
-import ffmpeg
+
+# librosa, numpy and ffmpeg are imported inside the functions that use them so
+# that importing this module (which every worker does via the route table)
+# does not pull the audio stack into workers that never process an upload.
+
+PREVIEW_SECONDS = 30
+ANALYSIS_SR = 22050
+HOP_LENGTH = 512  # ~23ms per envelope frame at 22.05kHz
+BPM_WINDOW_SECONDS = 10
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # piped mode keeps uploads in memory up to this, then spills to disk
+PREVIEW_MAX_BYTES = 2 * 1024 * 1024  # 30s at 192k is ~720KB
+PIPE_CHUNK = 64 * 1024
 
 def generate_30s_preview(file: FileStorage):
+    import ffmpeg
+
     input_temp = None
     output_temp = None
 
@@ -16,25 +34,26 @@ def generate_30s_preview(file: FileStorage):
         file.save(input_temp.name)
 
         # Optional: skip large files (>10MB)
-        if os.path.getsize(input_temp.name) > 10 * 1024 * 1024:
+        if os.path.getsize(input_temp.name) > MAX_UPLOAD_BYTES:
             raise Exception("Uploaded file is too large. Max 10MB allowed.")
 
-        # Generate preview (first 30s) to MP3
+        # Decode once and derive preview offset, duration and BPM from it
+        start, duration, bpm = analyze_audio(input_temp.name)
+
+        # Generate preview (best 30s) to MP3, seeking on the input side so
+        # ffmpeg doesn't decode everything before the window
         output_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
         output_path = output_temp.name
         output_temp.close()
 
         (
             ffmpeg
-            .input(input_temp.name)
-            .output(output_path, t=30, acodec='libmp3lame', audio_bitrate='192k')
+            .input(input_temp.name, ss=start)
+            .output(output_path, t=PREVIEW_SECONDS, acodec='libmp3lame', audio_bitrate='192k')
             .overwrite_output()
             .run(capture_stdout=True, capture_stderr=True)
         )
 
-        duration = detect_audio_duration(input_temp.name)
-        bpm = detect_bpm(input_temp.name)
-
         return input_temp.name, output_path, duration, bpm
 
     except ffmpeg.Error as e:
@@ -46,9 +65,261 @@ def generate_30s_preview(file: FileStorage):
         return None, None, None, None
 
 
-def detect_audio_format(file_path: str) -> str:
+def generate_30s_preview_piped(file: FileStorage, spool_max_size: int = SPOOL_MAX_BYTES):
+    """Temp-file-free variant of generate_30s_preview.
+
+    The upload is held in a SpooledTemporaryFile (memory, spilling to disk only
+    past spool_max_size), streamed to ffmpeg over stdin, and the MP3 preview is
+    read back from stdout into a bounded in-memory buffer. Returns
+    (source, preview, duration, bpm); source and preview are file objects
+    positioned at 0 that the caller uploads and closes.
+    """
+    import ffmpeg
+
+    source = None
+
+    try:
+        source = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+        file.save(source)
+
+        if source.tell() > MAX_UPLOAD_BYTES:
+            raise Exception("Uploaded file is too large. Max 10MB allowed.")
+
+        suffix = os.path.splitext(file.filename or "")[1]
+        start, duration, bpm = analyze_audio(source, suffix=suffix)
+        preview = _encode_preview_piped(source, start, suffix)
+
+        source.seek(0)
+        return source, preview, duration, bpm
+
+    except ffmpeg.Error as e:
+        print("FFmpeg error:", e.stderr.decode() if hasattr(e, "stderr") else str(e))
+    except Exception as e:
+        print("Unexpected error in generate_30s_preview_piped:", str(e))
+
+    if source is not None:
+        source.close()
+    return None, None, None, None
+
+
+def _run_piped(args, source, max_output: int):
+    """Run an ffmpeg/ffprobe command fed from `source` and return its stdout as a BytesIO.
+
+    stdin is written from a separate (gevent-patched) thread so a full stdout
+    pipe can't deadlock the writer; output past max_output aborts the process.
+    """
+    import ffmpeg
+
+    source.seek(0)
+    process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def feed():
+        try:
+            for chunk in iter(lambda: source.read(PIPE_CHUNK), b""):
+                process.stdin.write(chunk)
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg stops reading once it has the window it needs
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+
+    output = io.BytesIO()
+    try:
+        for chunk in iter(lambda: process.stdout.read(PIPE_CHUNK), b""):
+            if output.tell() + len(chunk) > max_output:
+                raise Exception(f"{args[0]} output exceeded {max_output} bytes")
+            output.write(chunk)
+        stderr = process.stderr.read()
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        writer.join()
+
+    if process.returncode != 0:
+        raise ffmpeg.Error(args[0], output.getvalue(), stderr)
+
+    output.seek(0)
+    return output
+
+
+def _spilled_copy(source, suffix=""):
+    """Copy a file object to a NamedTemporaryFile (flushed, deleted on close) for tools that need a path."""
+    spilled = tempfile.NamedTemporaryFile(suffix=suffix)
+    source.seek(0)
+    shutil.copyfileobj(source, spilled, PIPE_CHUNK)
+    spilled.flush()
+    source.seek(0)
+    return spilled
+
+
+def _encode_preview_piped(source, start, suffix=""):
+    """MP3 preview of source from start, fed over stdin; returns a BytesIO.
+
+    -xerror makes a demux error fail the run instead of producing an empty
+    preview. Formats that can't be read from a pipe (MP4/M4A with the index
+    at the end) are then encoded from a temp copy.
+    """
+    import ffmpeg
+
+    def preview_args(input_name):
+        return (
+            ffmpeg
+            .input(input_name, ss=start)
+            .output('pipe:1', format='mp3', t=PREVIEW_SECONDS, acodec='libmp3lame', audio_bitrate='192k')
+            .global_args('-loglevel', 'error', '-xerror')
+            .compile()
+        )
+
+    try:
+        return _run_piped(preview_args('pipe:0'), source, PREVIEW_MAX_BYTES)
+    except ffmpeg.Error as e:
+        stderr = e.stderr.decode(errors="replace").strip() if e.stderr else str(e)
+        print(f"Piped preview encode failed ({stderr}); retrying from a temp file")
+
+    with _spilled_copy(source, suffix) as spilled:
+        return _run_piped(preview_args(spilled.name), io.BytesIO(), PREVIEW_MAX_BYTES)
+
+
+def _probe(source):
+    """ffprobe a file path, or a file object streamed over stdin."""
+    import ffmpeg
+
+    if isinstance(source, str):
+        return ffmpeg.probe(source)
+    output = _run_piped(['ffprobe', '-v', 'error', '-show_format', '-show_streams', '-of', 'json', 'pipe:0'], source, PREVIEW_MAX_BYTES)
+    source.seek(0)
+    return json.loads(output.getvalue())
+
+
+def analyze_audio(source, suffix=""):
+    """Return (preview_start_seconds, duration, bpm) from a single decode of a path or file object.
+
+    suffix is the upload's extension, used if a file object has to be
+    decoded from a temp copy (see _load_audio).
+    """
+    import librosa
+
+    try:
+        y, sr = _load_audio(source, suffix)
+        onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=HOP_LENGTH)
+    except Exception as e:
+        print("Audio analysis failed:", str(e))
+        return 0.0, detect_audio_duration(source), "0"
+
+    frame_rate = sr / HOP_LENGTH
+    envelope = energy_envelope(y, onset_env, HOP_LENGTH)
+    start = find_best_window(envelope, frame_rate, PREVIEW_SECONDS)
+    duration = format_duration(len(y) / sr)
+    bpm = bpm_from_onset(onset_env[:int(BPM_WINDOW_SECONDS * frame_rate)], BPM_WINDOW_SECONDS)
+    return start, duration, bpm
+
+
+def _load_audio(source, suffix=""):
+    import librosa
+
+    if isinstance(source, str):
+        return librosa.load(source, sr=ANALYSIS_SR, mono=True)
+
+    source.seek(0)
+    try:
+        return librosa.load(source, sr=ANALYSIS_SR, mono=True)
+    except Exception as e:
+        # libsndfile can't decode every format (some MP3 builds, AAC) and
+        # librosa's audioread fallback only reads paths, so spill to disk
+        print(f"In-memory audio decode failed ({str(e)}); retrying from a temp file")
+    finally:
+        source.seek(0)
+
+    with _spilled_copy(source, suffix) as spilled:
+        return librosa.load(spilled.name, sr=ANALYSIS_SR, mono=True)
+
+
+def energy_envelope(y, onset_env, hop_length: int):
+    """Per-frame loudness (RMS) blended with onset strength, both scaled to 0..1."""
+    import numpy as np
+
+    n_frames = len(y) // hop_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    frames = y[:n_frames * hop_length].reshape(n_frames, hop_length)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    onset = np.asarray(onset_env[:n_frames], dtype=rms.dtype)
+    if len(onset) < n_frames:
+        onset = np.pad(onset, (0, n_frames - len(onset)))
+
+    def normalize(a):
+        peak = a.max()
+        return a / peak if peak > 0 else a
+
+    return normalize(rms) + normalize(onset)
+
+
+def find_best_window(envelope, frame_rate: float, window_seconds: float) -> float:
+    """Start time (seconds) of the window with the highest summed energy, O(n)."""
+    import numpy as np
+
+    window = int(round(window_seconds * frame_rate))
+    if window <= 0 or len(envelope) <= window:
+        return 0.0
+
+    cumulative = np.concatenate(([0.0], np.cumsum(envelope, dtype=np.float64)))
+    window_sums = cumulative[window:] - cumulative[:-window]
+    return round(float(np.argmax(window_sums)) / frame_rate, 2)
+
+
+def format_duration(seconds: float) -> str:
+    mins = int(seconds // 60)
+    secs = int(seconds % 60)
+    return f"{mins}:{secs:02d}"
+
+
+def bpm_from_onset(onset_env, seconds: float) -> str:
+    import numpy as np
+
+    if len(onset_env) == 0:
+        return "0"
+    tempo_estimate = np.count_nonzero(onset_env > np.mean(onset_env)) / seconds * 60
+    return str(int(round(tempo_estimate)))
+
+
+def generate_clip(source: str, output_path: str, start: float, length: float, bitrate: str = "64k"):
+    """Encode `length` seconds of `source` (path or URL) from `start` into a mono MP3.
+
+    Seeking happens on the input side, so for remote files ffmpeg issues a
+    range request near the offset instead of downloading the whole track.
+    """
+    import ffmpeg
+
+    (
+        ffmpeg
+        .input(source, ss=start, t=length)
+        .output(output_path, format='mp3', acodec='libmp3lame', audio_bitrate=bitrate, ac=1)
+        .global_args('-loglevel', 'error')
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+def parse_duration(duration) -> float:
+    """Inverse of format_duration; returns None for 'unknown'/missing values."""
     try:
-        probe = ffmpeg.probe(file_path)
+        mins, secs = str(duration).split(":")
+        return int(mins) * 60 + int(secs)
+    except (TypeError, ValueError):
+        return None
+
+
+def detect_audio_format(source) -> str:
+    try:
+        probe = _probe(source)
         if 'format' in probe and 'format_name' in probe['format']:
             return probe['format']['format_name']
     except Exception as e:
@@ -56,14 +327,11 @@ def detect_audio_format(file_path: str) -> str:
     return "unknown"
 
 
-def detect_audio_duration(file_path: str) -> str:
+def detect_audio_duration(source) -> str:
     try:
-        probe = ffmpeg.probe(file_path)
+        probe = _probe(source)
         if 'format' in probe and 'duration' in probe['format']:
-            seconds = float(probe['format']['duration'])
-            mins = int(seconds // 60)
-            secs = int(seconds % 60)
-            return f"{mins}:{secs:02d}"
+            return format_duration(float(probe['format']['duration']))
     except Exception as e:
         print("Audio duration detection failed:", str(e))
     return "unknown"
@@ -71,12 +339,12 @@ def detect_audio_duration(file_path: str) -> str:
 
 # ✅ Memory-safe, numba-free BPM detection
 def detect_bpm(file_path: str) -> str:
+    import librosa
+
     try:
-        y, sr = librosa.load(file_path, sr=22050, duration=10, mono=True)
+        y, sr = librosa.load(file_path, sr=ANALYSIS_SR, duration=BPM_WINDOW_SECONDS, mono=True)
         onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        tempo_estimate = np.count_nonzero(onset_env > np.mean(onset_env)) / 10 * 60
-        bpm = int(round(tempo_estimate))
-        return str(bpm)
+        return bpm_from_onset(onset_env, BPM_WINDOW_SECONDS)
     except Exception as e:
         print("BPM detection failed:", str(e))
         return "0"
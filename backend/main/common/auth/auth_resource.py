@@ -1,14 +1,13 @@
 import os
-import stripe
 from flask import request, jsonify
 from flask_restful import Resource
 from main.database.models import User, db
 from main.extension import bcrypt
 from main.common.jwt_utils import generate_token, token_required
+from main.common.payments import payment_client
 from dotenv import load_dotenv
 
 load_dotenv()
-stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
 VITE_API_BASE = os.environ.get("VITE_API_BASE", "https://ecommerce-music-fullstack-project.onrender.com")
 
@@ -46,7 +45,7 @@ class UserRegistrationResource(Resource):
             onboarding_url = None
             if role == "seller":
                 # Create Stripe account
-                account = stripe.Account.create(
+                account = payment_client().create_account(
                     type="express",
                     email=data["email"],
                     business_type="individual",
@@ -60,7 +59,7 @@ class UserRegistrationResource(Resource):
                 db.session.commit()
 
                 # Create Stripe account onboarding link
-                account_links = stripe.AccountLink.create(
+                account_links = payment_client().create_account_link(
                     account=account.id,
                     refresh_url=f"{VITE_API_BASE}/under-verification",
                     return_url=f"{VITE_API_BASE}/under-verification",
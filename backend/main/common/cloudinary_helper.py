@@ -10,6 +10,8 @@ def init_cloudinary(app):
         secure=True
     )
     
-def upload_to_cloudinary(file, folder="products"):
-    result = cloudinary.uploader.upload(file, folder=folder, resource_type="auto")
+def upload_to_cloudinary(file, folder="products", filename=None):
+    # file can be a local path or a file object; filename names streams
+    options = {"filename": filename} if filename else {}
+    result = cloudinary.uploader.upload(file, folder=folder, resource_type="auto", **options)
     return result.get("secure_url")
\ No newline at end of file
@@ -0,0 +1,169 @@
+import os
+import time
+import hashlib
+import threading
+import tempfile
+from stat import S_ISREG
+from flask import current_app
+
+
+def app_cache(name, root, max_bytes, suffix=""):
+    """Per-app DiskLRUCache stored in app.extensions, created on first use."""
+    cache = current_app.extensions.get(name)
+    if cache is None:
+        cache = current_app.extensions[name] = DiskLRUCache(root, max_bytes, suffix=suffix)
+    return cache
+
+
+class DiskLRUCache:
+    """Size-bounded on-disk cache with LRU eviction.
+
+    Entries are files under `root` named by a hash of the key. Fills are
+    written to a temp file in the same directory and renamed into place, so a
+    reader never sees a partial file. Concurrent misses for the same key in
+    this process share one fill; other processes may fill the same key
+    independently, which is safe because the rename is atomic.
+
+    Several worker processes usually share root, so the filesystem is the
+    only bookkeeping: a hit touches the file's mtime, and after each fill the
+    directory is scanned and the least recently used files are removed until
+    it is back under max_bytes. An entry can still be evicted by another
+    process between get() and opening it; callers refill on FileNotFoundError.
+    """
+
+    STALE_TMP_SECONDS = 3600  # temp files older than this were left by a crashed fill
+
+    def __init__(self, root, max_bytes, suffix=""):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._inflight = {}  # filename -> threading.Event
+        self.hits = 0
+        self.misses = 0
+        self.hit_bytes = 0  # bytes served from disk instead of being regenerated/refetched
+        os.makedirs(root, exist_ok=True)
+        self._remove_stale_tmp()
+
+    def _remove_stale_tmp(self):
+        # Only old ones: a fresh temp file may be another process's fill in progress
+        cutoff = time.time() - self.STALE_TMP_SECONDS
+        for mtime, name, _ in self._scan(temp=True):
+            if mtime < cutoff:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+
+    def _scan(self, temp=False):
+        """(mtime, name, size) of the entries under root, or of its temp files, oldest first."""
+        files = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(".tmp-") != temp:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process while scanning
+                if S_ISREG(stat.st_mode):
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        files.sort()
+        return files
+
+    def _filename(self, key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + self.suffix
+
+    def path_for(self, key):
+        return os.path.join(self.root, self._filename(key))
+
+    def get(self, key):
+        """Return the cached path for key, or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # the mtime is the LRU clock every process sharing root sees
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.hits += 1
+            self.hit_bytes += size
+        return path
+
+    def get_or_create(self, key, fill):
+        """Return a path for key, calling fill(tmp_path) to create it on a miss.
+
+        fill must write the complete entry to tmp_path; if it raises, nothing
+        is cached and the error propagates to every waiter's own retry.
+        """
+        name = self._filename(key)
+        while True:
+            path = self.get(key)
+            if path:
+                return path
+
+            with self._lock:
+                event = self._inflight.get(name)
+                if event is None:
+                    event = self._inflight[name] = threading.Event()
+                    owner = True
+                    self.misses += 1
+                else:
+                    owner = False
+
+            if not owner:
+                event.wait()
+                continue  # re-check; if the fill failed we become the filler
+
+            try:
+                return self._fill(name, fill)
+            finally:
+                with self._lock:
+                    del self._inflight[name]
+                event.set()
+
+    def _fill(self, name, fill):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.root)
+        os.close(fd)
+        try:
+            fill(tmp_path)
+            path = os.path.join(self.root, name)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._evict(keep=name)
+        return path
+
+    def _evict(self, keep):
+        # The entry just filled is never evicted, even if it alone exceeds the
+        # budget, so the caller can still serve it. Processes evicting at the
+        # same time may both remove a file; the loser just skips it.
+        files = self._scan()
+        total = sum(size for _, _, size in files)
+        for _, name, size in files:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        files = self._scan()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(files),
+                "bytes": sum(size for _, _, size in files),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self.hit_bytes,
+            }
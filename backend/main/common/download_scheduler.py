@@ -0,0 +1,155 @@
+import time
+import threading
+from collections import deque
+from flask import current_app
+
+
+def app_scheduler():
+    """Per-app DownloadScheduler stored in app.extensions, created on first use."""
+    scheduler = current_app.extensions.get("download_scheduler")
+    if scheduler is None:
+        config = current_app.config
+        scheduler = current_app.extensions["download_scheduler"] = DownloadScheduler(
+            max_per_user=config["DOWNLOAD_MAX_STREAMS_PER_USER"],
+            max_total=config["DOWNLOAD_MAX_STREAMS"],
+            max_queued=config["DOWNLOAD_MAX_QUEUED"],
+            queue_timeout=config["DOWNLOAD_QUEUE_TIMEOUT"],
+            bandwidth=config["DOWNLOAD_BANDWIDTH_BYTES"]
+        )
+    return scheduler
+
+
+class Slot:
+    """One admitted download stream; release() is safe to call more than once."""
+
+    def __init__(self, scheduler, user_id):
+        self.scheduler = scheduler
+        self.user_id = user_id
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._release(self.user_id)
+
+
+class DownloadScheduler:
+    """Admission control and bandwidth sharing for streamed downloads.
+
+    A request gets a slot if its user has fewer than max_per_user streams
+    (active or queued) and fewer than max_total streams are active. When the
+    worker is full, requests wait in a FIFO queue for up to queue_timeout
+    seconds; a full queue, a timeout or a user over their cap is rejected
+    and the caller answers with Retry-After.
+
+    When bandwidth (bytes/s for this worker) is set, pace() holds each stream
+    to an equal share of it with a token bucket, so one buyer's fast
+    connection can't take the whole uplink. Uses threading primitives, which
+    gevent's monkey patching makes greenlet-aware.
+    """
+
+    BURST_SECONDS = 0.5  # how far ahead of its rate a stream may get after idling
+
+    def __init__(self, max_per_user, max_total, max_queued=0, queue_timeout=0, bandwidth=0):
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.bandwidth = bandwidth
+        self._cond = threading.Condition()
+        self._active = 0
+        self._per_user = {}  # user_id -> active + queued streams
+        self._queue = deque()  # waiting tickets, oldest first
+        self.admitted = 0
+        self.rejected = 0
+        self.bytes_sent = 0
+
+    def acquire(self, user_id):
+        """Return a Slot, or None if the request should be retried later."""
+        with self._cond:
+            if self._per_user.get(user_id, 0) >= self.max_per_user:
+                self.rejected += 1
+                return None
+
+            if self._active < self.max_total and not self._queue:
+                return self._admit(user_id)
+
+            if len(self._queue) >= self.max_queued or self.queue_timeout <= 0:
+                self.rejected += 1
+                return None
+
+            ticket = object()
+            self._queue.append(ticket)
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                # Only the head of the queue may take a free slot, so waiters are served in order
+                while self._queue[0] is not ticket or self._active >= self.max_total:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        self._drop_user(user_id)
+                        return None
+                    self._cond.wait(remaining)
+                self._drop_user(user_id)
+                return self._admit(user_id)
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def _admit(self, user_id):
+        # Caller holds the lock
+        self._active += 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        self.admitted += 1
+        return Slot(self, user_id)
+
+    def _drop_user(self, user_id):
+        count = self._per_user.get(user_id, 0) - 1
+        if count > 0:
+            self._per_user[user_id] = count
+        else:
+            self._per_user.pop(user_id, None)
+
+    def _release(self, user_id):
+        with self._cond:
+            self._active -= 1
+            self._drop_user(user_id)
+            self._cond.notify_all()
+
+    def pace(self, chunks, slot):
+        """Yield chunks no faster than this stream's share of the bandwidth, then release slot."""
+        tokens = 0.0
+        last = time.monotonic()
+        try:
+            for chunk in chunks:
+                if self.bandwidth:
+                    # Equal share among the streams active right now
+                    rate = self.bandwidth / max(1, self._active)
+                    now = time.monotonic()
+                    tokens = min(tokens + (now - last) * rate, rate * self.BURST_SECONDS)
+                    last = now
+                    tokens -= len(chunk)
+                    if tokens < 0:
+                        time.sleep(-tokens / rate)
+                self.bytes_sent += len(chunk)
+                yield chunk
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            slot.release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._queue),
+                "users": len(self._per_user),
+                "max_total": self.max_total,
+                "max_per_user": self.max_per_user,
+                "bandwidth": self.bandwidth,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "bytes_sent": self.bytes_sent,
+            }
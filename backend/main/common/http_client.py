@@ -0,0 +1,142 @@
+"""Shared outbound HTTP client.
+
+One requests.Session with a single keep-alive pool manager (one pool per
+host) is used for storage downloads, the Stripe SDK and Cloudinary uploads,
+so repeat calls to the same host reuse TCP/TLS connections. The session is
+created in init_http_client() after gevent has patched the stdlib, so pool
+locks and queues are greenlet-aware.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_session = None
+_adapter = None
+_default_timeout = (5, 30)
+
+
+class _MeteredPoolMixin:
+    """Counts checkouts, new connections, in-use and waiting callers per host pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"in_use": 0, "waiting": 0, "checkouts": 0, "new_connections": 0}
+
+    def _bump(self, key, delta):
+        with self._metrics_lock:
+            self.metrics[key] = max(0, self.metrics[key] + delta)
+
+    def _get_conn(self, timeout=None):
+        self._bump("waiting", 1)
+        try:
+            conn = super()._get_conn(timeout=timeout)
+        finally:
+            self._bump("waiting", -1)
+        self._bump("checkouts", 1)
+        self._bump("in_use", 1)
+        return conn
+
+    def _put_conn(self, conn):
+        self._bump("in_use", -1)
+        super()._put_conn(conn)
+
+    def _new_conn(self):
+        self._bump("new_connections", 1)
+        return super()._new_conn()
+
+
+class MeteredHTTPConnectionPool(_MeteredPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class MeteredHTTPSConnectionPool(_MeteredPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class MeteredHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": MeteredHTTPConnectionPool,
+            "https": MeteredHTTPSConnectionPool,
+        }
+
+
+def init_http_client(app):
+    """Build the shared session from app config and point Stripe and Cloudinary at it."""
+    global _session, _adapter, _default_timeout
+
+    _default_timeout = (app.config["HTTP_CONNECT_TIMEOUT"], app.config["HTTP_READ_TIMEOUT"])
+
+    # Retries cover connection errors and 502/503/504 on idempotent methods
+    # only; POSTs to the payment provider are never replayed here.
+    retry = Retry(
+        total=app.config["HTTP_RETRIES"],
+        backoff_factor=app.config["HTTP_RETRY_BACKOFF"],
+        status_forcelist=(502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False
+    )
+    _adapter = MeteredHTTPAdapter(
+        pool_connections=app.config["HTTP_POOL_HOSTS"],
+        pool_maxsize=app.config["HTTP_POOL_MAXSIZE"],
+        pool_block=app.config["HTTP_POOL_BLOCK"],
+        max_retries=retry
+    )
+    _session = requests.Session()
+    _session.mount("http://", _adapter)
+    _session.mount("https://", _adapter)
+
+    import stripe
+    stripe.default_http_client = stripe.RequestsClient(session=_session, timeout=_default_timeout)
+
+    import cloudinary.uploader
+    cloudinary.uploader._http = _adapter.poolmanager
+
+
+def get_session():
+    global _session
+    if _session is None:
+        # Outside an app (scripts, benchmarks): plain session, no shared pools
+        _session = requests.Session()
+    return _session
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", _default_timeout)
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def pool_stats():
+    """Per-host pool metrics for this worker."""
+    if _adapter is None:
+        return {}
+
+    stats = {}
+    pools = _adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        metrics = getattr(pool, "metrics", None)
+        if pool is None or metrics is None:
+            continue
+        host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+        entry = stats.setdefault(host, {"in_use": 0, "waiting": 0, "checkouts": 0, "new_connections": 0, "idle": 0})
+        for name in ("in_use", "waiting", "checkouts", "new_connections"):
+            entry[name] += metrics[name]
+        entry["idle"] += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+
+    for entry in stats.values():
+        checkouts = entry["checkouts"]
+        entry["reuse_ratio"] = round(1 - entry["new_connections"] / checkouts, 4) if checkouts else 0.0
+    return stats
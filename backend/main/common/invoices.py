@@ -0,0 +1,290 @@
+"""PDF invoices for paid orders.
+
+A paid order's invoice never changes, so it is rendered once and stored
+under STORAGE_ROOT/invoices named by the SHA-256 of its bytes. Order.invoice_key
+points at the file. ReportLab runs in invariant mode, so re-rendering the
+same order gives the same bytes and the same key.
+
+Rendering only happens in the background worker, which relays order.paid
+events (see outbox.py), and in `flask render-invoices`, which backfills
+orders paid before invoices were stored. ReportLab's drawing never runs in
+a web process: a request for an invoice that isn't stored yet records an
+order.invoice_requested event for the worker and is told to retry.
+"""
+import os
+import hashlib
+from io import BytesIO
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update
+from main.extension import db
+from main.database.models import Order, OrderItem, Product, User, OutboxEvent
+from main.common.storage import stored_path
+from main.common.outbox import subscribe, record_order_event
+
+INVOICE_FOLDER = "invoices"
+
+
+def invoice_data(order_ids):
+    """Everything an invoice shows, as plain dicts keyed by order id, in three queries."""
+    if not order_ids:
+        return {}
+    orders = Order.query.filter(Order.id.in_(order_ids)).all()
+    buyers = {u.id: u for u in User.query.filter(User.id.in_({o.buyer_id for o in orders})).all()}
+    rows = (
+        db.session.query(
+            OrderItem.order_id, Product.title, OrderItem.price, OrderItem.quantity,
+            User.name, User.email, User.store_name
+        )
+        .join(Product, Product.id == OrderItem.product_id)
+        .join(User, User.id == OrderItem.seller_id)
+        .filter(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.id)
+        .all()
+    )
+
+    data = {}
+    for order in orders:
+        buyer = buyers[order.buyer_id]
+        data[order.id] = {
+            "id": order.id,
+            "created_at": order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "total_price": order.total_price,
+            "buyer": {"id": buyer.id, "name": buyer.name, "email": buyer.email},
+            "items": [],
+            "sellers": [],
+        }
+    for order_id, title, price, quantity, name, email, store_name in rows:
+        invoice = data[order_id]
+        invoice["items"].append({"title": title, "price": price, "quantity": quantity})
+        seller = [name, email, store_name or "N/A"]
+        if seller not in invoice["sellers"]:
+            invoice["sellers"].append(seller)
+    return data
+
+
+def render_invoice(invoice):
+    """Draw one invoice (a dict from invoice_data) and return the PDF bytes."""
+    # ReportLab is only needed here, so keep it out of worker startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    # invariant: no timestamps or random ids in the file, so equal invoices are equal bytes
+    p = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    width, height = letter
+    margin = 50
+    y = height - margin
+    line_height = 18
+
+    def draw_header():
+        nonlocal y
+        # Colored header
+        p.setFillColor(colors.HexColor("#6B46C1"))  # Purple
+        p.rect(0, height - 60, width, 60, fill=1, stroke=0)
+        p.setFillColor(colors.white)
+        p.setFont("Helvetica-Bold", 20)
+        p.drawString(margin, height - 40, "INVOICE")
+        p.setFillColor(colors.black)
+        y -= 80
+
+    def draw_footer():
+        p.setFont("Helvetica-Oblique", 10)
+        p.setFillColor(colors.HexColor("#4A5568"))  # Gray
+        p.drawCentredString(width / 2, 40, "Thank you for shopping with us!")
+        p.setFillColor(colors.black)
+
+    def new_page():
+        nonlocal y
+        p.showPage()
+        draw_header()
+        y = height - margin
+
+    draw_header()
+
+    # Invoice Metadata
+    buyer = invoice["buyer"]
+    p.setFont("Helvetica", 12)
+    p.drawString(margin, y, f"Invoice #: {invoice['id']}")
+    y -= line_height
+    p.drawString(margin, y, f"Date: {invoice['created_at']}")
+    y -= line_height
+    p.drawString(margin, y, f"Buyer: {buyer['name']} (ID: {buyer['id']})")
+    y -= line_height
+    p.drawString(margin, y, f"Email: {buyer['email']}")
+    y -= line_height * 2
+
+    # Table Header
+    p.setFont("Helvetica-Bold", 12)
+    p.setFillColor(colors.HexColor("#EDF2F7"))  # Light gray background
+    p.rect(margin - 5, y - 5, width - 2 * margin + 10, line_height + 4, fill=1, stroke=0)
+    p.setFillColor(colors.black)
+    p.drawString(margin, y, "Item")
+    p.drawString(margin + 200, y, "Price")
+    p.drawString(margin + 300, y, "Qty")
+    p.drawString(margin + 370, y, "Total")
+    y -= line_height + 6
+
+    p.setFont("Helvetica", 12)
+
+    for item in invoice["items"]:
+        if y < 100:
+            new_page()
+
+        total = item["price"] * item["quantity"]
+        p.drawString(margin, y, item["title"])
+        p.drawString(margin + 200, y, f"${item['price']:.2f}")
+        p.drawString(margin + 300, y, str(item["quantity"]))
+        p.drawString(margin + 370, y, f"${total:.2f}")
+        y -= line_height
+
+    # Total Summary
+    if y < 120:
+        new_page()
+
+    y -= line_height
+    p.line(margin, y + 6, width - margin, y + 6)
+    y -= line_height
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(width - margin - 10, y, f"Total: ${invoice['total_price']:.2f}")
+    y -= line_height * 2
+
+    # Seller Information Section (after table)
+    p.setFont("Helvetica-Bold", 13)
+    p.drawString(margin, y, "Seller Information")
+    y -= line_height
+
+    p.setFont("Helvetica", 11)
+    for name, email, store in invoice["sellers"]:
+        if y < 80:
+            new_page()
+        p.drawString(margin, y, f"Name: {name}")
+        y -= line_height
+        p.drawString(margin, y, f"Email: {email}")
+        y -= line_height
+        p.drawString(margin, y, f"Store: {store}")
+        y -= line_height * 2
+
+    draw_footer()
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def render_and_store(invoice, storage_root):
+    """Render an invoice and write it content-addressed under storage_root; returns its storage key.
+
+    An existing file with the same key already has these exact bytes and is
+    left alone.
+    """
+    pdf = render_invoice(invoice)
+    digest = hashlib.sha256(pdf).hexdigest()
+    key = f"{INVOICE_FOLDER}/{digest[:2]}/{digest[2:4]}/{digest}.pdf"
+    path = os.path.join(storage_root, *key.split("/"))
+    if not os.path.isfile(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp_path, path)
+    return key
+
+
+def _record_invoice(order_id, key):
+    db.session.execute(
+        update(Order)
+        .where(Order.id == order_id)
+        .values(invoice_key=key)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def render_invoices(order_ids, log=print):
+    """Render and record the invoices of these paid orders; returns how many were stored.
+
+    Orders whose invoice is already stored are skipped, so redelivered and
+    repeated requests are cheap. Each invoice is committed on its own, so one
+    failure doesn't lose the rest. Failures are only logged; the next
+    request for the invoice asks for it again.
+    """
+    storage_root = current_app.config["STORAGE_ROOT"]
+    pending = [
+        order_id for order_id, key in
+        db.session.query(Order.id, Order.invoice_key).filter(Order.id.in_(order_ids))
+        if not stored_path(key)
+    ]
+    stored = 0
+    for order_id, invoice in invoice_data(pending).items():
+        try:
+            _record_invoice(order_id, render_and_store(invoice, storage_root))
+            stored += 1
+        except Exception as e:
+            db.session.rollback()
+            log(f"Invoice render failed for order {order_id}: {str(e)}")
+    return stored
+
+
+@subscribe("order.paid", "order.invoice_requested")
+def render_paid_invoices(events):
+    render_invoices(sorted({event["aggregate_id"] for event in events}))
+
+
+def invoice_paths(orders):
+    """({order_id: (key, path)}, [orders]) for paid orders: the stored invoices, and the orders without one."""
+    paths = {}
+    missing = []
+    for order in orders:
+        path = stored_path(order.invoice_key)
+        if path:
+            paths[order.id] = (order.invoice_key, path)
+        else:
+            missing.append(order)
+    return paths, missing
+
+
+def request_invoices(orders):
+    """Ask the background worker to render these orders' invoices, and commit.
+
+    Orders that already have a request waiting in the outbox don't get
+    another, so clients polling for an invoice don't pile up events.
+    """
+    waiting = {
+        order_id for (order_id,) in
+        db.session.query(OutboxEvent.aggregate_id).filter(
+            OutboxEvent.aggregate_type == "order",
+            OutboxEvent.aggregate_id.in_([order.id for order in orders]),
+            OutboxEvent.event_type == "order.invoice_requested",
+            OutboxEvent.published_at.is_(None)
+        )
+    }
+    for order in orders:
+        if order.id not in waiting:
+            record_order_event(order, "order.invoice_requested")
+    db.session.commit()
+
+
+@click.command("render-invoices")
+@click.option("--batch-size", default=100, show_default=True, help="Orders rendered per batch.")
+@with_appcontext
+def render_invoices_command(batch_size):
+    """Render and store invoices for paid orders that don't have one yet."""
+    total = 0
+    last_id = 0
+    while True:
+        order_ids = [
+            order_id for (order_id,) in
+            db.session.query(Order.id)
+            .filter(Order.status == "paid", Order.invoice_key.is_(None), Order.id > last_id)
+            .order_by(Order.id)
+            .limit(batch_size)
+        ]
+        if not order_ids:
+            break
+        last_id = order_ids[-1]
+        total += render_invoices(order_ids, log=click.echo)
+        click.echo(f"rendered {total} invoices")
+    click.echo(f"stored {total} invoices")
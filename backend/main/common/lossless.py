@@ -0,0 +1,142 @@
+import os
+import struct
+import tempfile
+import mimetypes
+import subprocess
+from main.common import http_client
+from main.common.audio_preview_generator import _probe, _run_piped, PIPE_CHUNK
+
+# WAV codecs FLAC stores bit-exactly (float WAVs are kept as they are)
+FLAC_PCM_CODECS = ("pcm_s16le", "pcm_s24le")
+RAW_PCM_FORMATS = {16: "s16le", 24: "s24le"}
+STREAMINFO_BYTES = 42  # "fLaC" + metadata block header + STREAMINFO, always first in the file
+WAV_HEADER_BYTES = 44
+
+mimetypes.add_type("audio/flac", ".flac")
+
+
+def flac_compatible(source) -> bool:
+    """True if source (path or file object) is a single-stream PCM WAV FLAC can hold losslessly."""
+    try:
+        probe = _probe(source)
+    except Exception as e:
+        print("FLAC compatibility probe failed:", str(e))
+        return False
+    if probe.get("format", {}).get("format_name") != "wav":
+        return False
+    audio = [s for s in probe.get("streams", []) if s.get("codec_type") == "audio"]
+    return len(audio) == 1 and audio[0].get("codec_name") in FLAC_PCM_CODECS
+
+
+def wav_to_flac(source):
+    """Losslessly transcode a WAV (path or file object) to a temp .flac file.
+
+    Returns the temp path, which the caller removes, or None if the source
+    isn't a WAV FLAC can represent exactly. The output is a real file rather
+    than a pipe so ffmpeg can seek back and fill in STREAMINFO (sample count
+    and MD5), which stream_wav() relies on for an exact Content-Length.
+    """
+    if not flac_compatible(source):
+        return None
+
+    fd, output_path = tempfile.mkstemp(suffix=".flac")
+    os.close(fd)
+    args = [
+        "ffmpeg", "-loglevel", "error", "-y",
+        "-i", source if isinstance(source, str) else "pipe:0",
+        "-map", "0:a:0", "-c:a", "flac", "-compression_level", "8",
+        output_path
+    ]
+    try:
+        if isinstance(source, str):
+            subprocess.run(args, check=True, capture_output=True)
+        else:
+            _run_piped(args, source, PIPE_CHUNK)
+            source.seek(0)
+    except BaseException:
+        os.remove(output_path)
+        raise
+    return output_path
+
+
+def pcm_md5(path):
+    """MD5 of the decoded audio samples, so a WAV and its FLAC can be compared."""
+    result = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", path, "-map", "0:a:0", "-f", "md5", "-"],
+        check=True, capture_output=True
+    )
+    return result.stdout.decode().strip()
+
+
+def read_streaminfo(source):
+    """Parse STREAMINFO from a FLAC path or URL; None if it isn't a FLAC file.
+
+    Returns a dict of sample_rate, channels, bits and total_samples (0 when
+    the encoder didn't know the length).
+    """
+    if source.startswith(("http://", "https://")):
+        with http_client.get(source, headers={"Range": f"bytes=0-{STREAMINFO_BYTES - 1}"}) as response:
+            response.raise_for_status()
+            head = response.content[:STREAMINFO_BYTES]
+    else:
+        with open(source, "rb") as f:
+            head = f.read(STREAMINFO_BYTES)
+
+    if len(head) < STREAMINFO_BYTES or head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        return None
+
+    info = head[8:]
+    return {
+        "sample_rate": int.from_bytes(info[10:13], "big") >> 4,
+        "channels": ((info[12] >> 1) & 0x07) + 1,
+        "bits": (((info[12] & 0x01) << 4) | (info[13] >> 4)) + 1,
+        "total_samples": ((info[13] & 0x0F) << 32) | int.from_bytes(info[14:18], "big"),
+    }
+
+
+def wav_size(info):
+    """Exact size of the WAV stream_wav() produces, or None if it can't be known up front."""
+    if not info or not info["total_samples"] or info["bits"] not in RAW_PCM_FORMATS:
+        return None
+    return WAV_HEADER_BYTES + info["total_samples"] * info["channels"] * info["bits"] // 8
+
+
+def wav_header(info):
+    block_align = info["channels"] * info["bits"] // 8
+    data_size = info["total_samples"] * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, info["channels"], info["sample_rate"],
+        info["sample_rate"] * block_align, block_align, info["bits"],
+        b"data", data_size
+    )
+
+
+def stream_wav(source, info):
+    """Yield a WAV rebuilt from a FLAC path or URL as ffmpeg decodes it.
+
+    With a known length the header is written here and ffmpeg only emits raw
+    PCM, so the result has exact sizes; otherwise ffmpeg's own WAV muxer is
+    used. ffmpeg is killed if the client goes away.
+    """
+    known = wav_size(info) is not None
+    if known:
+        pcm = RAW_PCM_FORMATS[info["bits"]]
+        output = ["-f", pcm, "-c:a", f"pcm_{pcm}"]
+    else:
+        output = ["-f", "wav"]
+    args = ["ffmpeg", "-loglevel", "error", "-i", source, "-map", "0:a:0", *output, "pipe:1"]
+
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        if known:
+            yield wav_header(info)
+        for chunk in iter(lambda: process.stdout.read(PIPE_CHUNK), b""):
+            yield chunk
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
@@ -0,0 +1,24 @@
+from flask import request, current_app
+from flask_restful import Resource
+from main.common.signed_urls import verify_signature
+from main.common.storage import PUBLIC_FOLDERS, stored_path, send_local_file
+
+
+class MediaFileResource(Resource):
+    def get(self, key):
+        # Previews are public; originals need a URL signed by the download endpoint
+        folder = key.split("/", 1)[0]
+        public = folder in PUBLIC_FOLDERS
+        if not public:
+            signing_key = current_app.config["DOWNLOAD_SIGNING_KEY"]
+            if not signing_key or not verify_signature(
+                request.path, request.args.get("expires"), request.args.get("signature"), signing_key
+            ):
+                return {"code": 403, "message": "Invalid or expired link", "status": 0}, 403
+
+        path = stored_path(key)
+        if not path:
+            return {"code": 404, "message": "File not found", "status": 0}, 404
+
+        # Stored names are random and never reused, so public files can be cached for long
+        return send_local_file(path, max_age=86400 if public else None)
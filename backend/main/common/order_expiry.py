@@ -0,0 +1,108 @@
+import time
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update
+from main.extension import db
+from main.database.models import Order
+from main.common.outbox import record_order_event
+
+BATCH_PAUSE = 0.05  # seconds between batches, so other writers get the table
+
+
+def supports_skip_locked():
+    """SKIP LOCKED needs PostgreSQL 9.5+, MySQL 8.0.1+ or MariaDB 10.6+ (SQLite has no row locks)."""
+    dialect = db.engine.dialect
+    if dialect.name not in ("mysql", "mariadb"):
+        return True
+    version = dialect.server_version_info or ()
+    if getattr(dialect, "is_mariadb", False):
+        return version >= (10, 6)
+    return version >= (8, 0, 1)
+
+
+def expire_batch(cutoff, batch_size):
+    """Expire up to batch_size pending orders created before cutoff.
+
+    Candidates come off the (status, created_at) index and are row-locked
+    with SKIP LOCKED, so concurrent sweepers take different rows and a
+    webhook paying one of them waits at most for this small batch. On
+    servers without SKIP LOCKED (MySQL 5.7, older MariaDB) a plain FOR
+    UPDATE is used, so concurrent sweepers wait for each other instead. The
+    UPDATE still re-checks status for databases without row locks. Each batch
+    is its own short transaction, with its outbox events. Returns
+    (candidates, expired); candidates is 0 once nothing is left.
+    """
+    ids = [
+        order_id for (order_id,) in
+        db.session.query(Order.id)
+        .filter(Order.status == "pending", Order.created_at < cutoff)
+        .order_by(Order.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=supports_skip_locked())
+    ]
+    if not ids:
+        db.session.rollback()
+        return 0, 0
+
+    db.session.execute(
+        update(Order)
+        .where(Order.id.in_(ids), Order.status == "pending")
+        .values(status="expired")
+        .execution_options(synchronize_session=False)
+    )
+    # The candidates are locked, so the ones now 'expired' are the ones this UPDATE changed
+    expired = Order.query.filter(Order.id.in_(ids), Order.status == "expired").all()
+    for order in expired:
+        record_order_event(order, "order.expired")
+    db.session.commit()
+    return len(ids), len(expired)
+
+
+def expire_stale_orders(ttl_seconds, batch_size=200, log=None):
+    """Expire every pending order older than ttl_seconds, in batches; returns the total."""
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    total = 0
+    while True:
+        candidates, expired = expire_batch(cutoff, batch_size)
+        if not candidates:
+            break
+        total += expired
+        if log:
+            log(f"expired {expired} orders")
+        time.sleep(BATCH_PAUSE)
+    return total
+
+
+def _sweep(app):
+    return expire_stale_orders(app.config["PENDING_ORDER_TTL"], app.config["ORDER_SWEEP_BATCH_SIZE"])
+
+
+def start_order_sweeper(app):
+    """Sweep every ORDER_SWEEP_INTERVAL in a daemon thread; concurrent sweepers are safe."""
+    def run():
+        while True:
+            time.sleep(app.config["ORDER_SWEEP_INTERVAL"])
+            with app.app_context():
+                try:
+                    _sweep(app)
+                except Exception as e:
+                    db.session.rollback()
+                    print("Order sweeper error:", str(e))
+
+    thread = threading.Thread(target=run, name="order-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("expire-orders")
+@with_appcontext
+def expire_orders_command():
+    """Mark pending orders older than PENDING_ORDER_TTL as expired."""
+    app = current_app._get_current_object()
+    total = expire_stale_orders(
+        app.config["PENDING_ORDER_TTL"], app.config["ORDER_SWEEP_BATCH_SIZE"], log=click.echo
+    )
+    click.echo(f"expired {total} pending orders")
@@ -0,0 +1,173 @@
+"""Transactional outbox for order lifecycle events.
+
+Code that changes an order's state calls record_order_event() before it
+commits, so the event row is written in the same transaction as the change
+and exists exactly when the change does. A relay reads unpublished events
+in id order and hands them, batched per event type, to the subscribers
+registered with @subscribe in the relay's own process.
+
+This is a work queue, not a broadcast: each event is handled by whichever
+relay publishes it, and web processes never see it. Run the relay in one
+dedicated process (worker.py or `flask relay-outbox`), which is what the
+default OUTBOX_RELAY='off' assumes; subscribers that need to reach every
+web worker must go through shared state such as the database.
+
+Delivery is at least once: events are marked published after subscribers
+have run, so a crash in between, or more than one relay, can deliver an
+event twice. Subscribers must be idempotent. A subscriber that raises is
+logged and skipped; it doesn't hold the outbox back.
+"""
+import json
+import threading
+from datetime import datetime, timedelta
+from collections import defaultdict
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, update, func
+from sqlalchemy.orm import Session
+from main.extension import db
+from main.database.models import OutboxEvent
+
+PRUNE_INTERVAL = 3600  # seconds between deletes of old published events
+
+_subscribers = defaultdict(list)  # event type -> [fn(events)]
+_wakeup = threading.Event()
+
+
+def subscribe(*event_types):
+    """Register fn(events) for these event types; events is a list of dicts in outbox order."""
+    def register(fn):
+        for event_type in event_types:
+            _subscribers[event_type].append(fn)
+        return fn
+    return register
+
+
+def record_order_event(order, event_type, **data):
+    """Add an outbox event for order to the current transaction (no commit)."""
+    if order.id is None:
+        db.session.flush()
+    payload = {
+        "order_id": order.id,
+        "buyer_id": order.buyer_id,
+        "status": order.status,
+        "total_price": order.total_price,
+        **data
+    }
+    db.session.add(OutboxEvent(
+        aggregate_type="order",
+        aggregate_id=order.id,
+        event_type=event_type,
+        payload=json.dumps(payload),
+        created_at=datetime.utcnow()
+    ))
+    db.session.info["outbox_pending"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session):
+    # Only wake the relay once the events are visible to it
+    if session.info.pop("outbox_pending", False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_pending(session, previous_transaction):
+    session.info.pop("outbox_pending", None)
+
+
+def relay_outbox(batch_size=100):
+    """Publish one batch of unpublished events; returns how many were published."""
+    rows = (
+        OutboxEvent.query
+        .filter(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not rows:
+        return 0
+
+    by_type = defaultdict(list)
+    for row in rows:
+        by_type[row.event_type].append({
+            "id": row.id,
+            "type": row.event_type,
+            "aggregate_id": row.aggregate_id,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "payload": json.loads(row.payload),
+        })
+    ids = [row.id for row in rows]
+    db.session.rollback()  # don't hold the read transaction open while subscribers run
+
+    for event_type, events in by_type.items():
+        for subscriber in _subscribers.get(event_type, []):
+            try:
+                subscriber(events)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Outbox subscriber {subscriber.__name__} failed on {event_type}:", str(e))
+
+    db.session.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(ids), OutboxEvent.published_at.is_(None))
+        .values(published_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return len(ids)
+
+
+def prune_outbox(retention_days):
+    """Delete events published more than retention_days ago; returns how many."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = OutboxEvent.query.filter(OutboxEvent.published_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def outbox_backlog():
+    return db.session.query(func.count(OutboxEvent.id)).filter(OutboxEvent.published_at.is_(None)).scalar()
+
+
+def _drain(app):
+    while relay_outbox(app.config["OUTBOX_BATCH_SIZE"]):
+        pass
+
+
+def start_outbox_relay(app):
+    """Run the relay in a daemon thread (a greenlet under gevent); see the module docstring on running one."""
+    def run():
+        last_prune = 0
+        while True:
+            _wakeup.wait(app.config["OUTBOX_POLL_INTERVAL"])
+            _wakeup.clear()
+            with app.app_context():
+                try:
+                    _drain(app)
+                    now = datetime.utcnow().timestamp()
+                    if now - last_prune > PRUNE_INTERVAL:
+                        prune_outbox(app.config["OUTBOX_RETENTION_DAYS"])
+                        last_prune = now
+                except Exception as e:
+                    db.session.rollback()
+                    print("Outbox relay error:", str(e))
+
+    thread = threading.Thread(target=run, name="outbox-relay", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("relay-outbox")
+@click.option("--once", is_flag=True, help="Publish what is pending and exit instead of polling.")
+@with_appcontext
+def relay_outbox_command(once):
+    """Publish order lifecycle events to this process's subscribers."""
+    app = current_app._get_current_object()
+    while True:
+        _drain(app)
+        if once:
+            break
+        _wakeup.wait(app.config["OUTBOX_POLL_INTERVAL"])
+        _wakeup.clear()
@@ -0,0 +1,205 @@
+"""Payment provider client.
+
+Views get the client with payment_client() instead of calling the stripe
+module directly. PAYMENT_PROVIDER picks the implementation: 'stripe' talks to
+Stripe, 'fake' is an in-process stand-in with the same interface for load
+tests and offline development. The fake signs webhook events the way Stripe
+does, so they go through the real webhook endpoint unchanged.
+"""
+import hmac
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+from collections import OrderedDict
+from flask import current_app
+
+SIGNATURE_TOLERANCE = 300  # seconds, as in stripe.Webhook
+
+
+class PaymentError(Exception):
+    """The provider rejected or failed a call."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.user_message = message
+
+
+class SignatureError(PaymentError):
+    """A webhook payload's signature didn't verify."""
+
+
+def init_payments(app):
+    provider = app.config["PAYMENT_PROVIDER"]
+    if provider == "fake":
+        client = FakePaymentClient(
+            webhook_secret=app.config["STRIPE_WEBHOOK_SECRET"] or "whsec_fake",
+            latency=app.config["FAKE_PAYMENT_LATENCY"],
+            failure_rate=app.config["FAKE_PAYMENT_FAILURE_RATE"]
+        )
+    elif provider == "stripe":
+        client = StripePaymentClient(app.config["STRIPE_SECRET_KEY"])
+    else:
+        raise ValueError(f"Unknown PAYMENT_PROVIDER {provider!r}")
+    app.extensions["payments"] = client
+
+
+def payment_client():
+    return current_app.extensions["payments"]
+
+
+class StripePaymentClient:
+    def __init__(self, api_key):
+        import stripe
+
+        self._stripe = stripe
+        # Uses the pooled session installed by init_http_client, when there is one
+        self._client = stripe.StripeClient(api_key or "", http_client=stripe.default_http_client)
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except self._stripe.error.StripeError as e:
+            raise PaymentError(e.user_message or str(e)) from e
+
+    def create_checkout_session(self, **params):
+        return self._call(self._client.checkout.sessions.create, params)
+
+    def retrieve_checkout_session(self, session_id):
+        return self._call(self._client.checkout.sessions.retrieve, session_id)
+
+    def create_account(self, **params):
+        return self._call(self._client.accounts.create, params)
+
+    def create_account_link(self, **params):
+        return self._call(self._client.account_links.create, params)
+
+    def construct_event(self, payload, sig_header, secret):
+        try:
+            return self._stripe.Webhook.construct_event(payload=payload, sig_header=sig_header, secret=secret)
+        except self._stripe.error.SignatureVerificationError as e:
+            raise SignatureError(str(e)) from e
+
+
+class FakePaymentClient:
+    """In-memory provider with injectable latency and failures.
+
+    Every call sleeps for `latency` seconds (+/-50% jitter) and then fails
+    with probability `failure_rate`. State lives in this process only, and
+    the oldest sessions are forgotten past MAX_SESSIONS.
+    """
+
+    MAX_SESSIONS = 100000
+
+    def __init__(self, webhook_secret, latency=0.0, failure_rate=0.0, seed=None):
+        self.webhook_secret = webhook_secret
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self.calls = 0
+        self.failures = 0
+
+    def _simulate(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * self._random.uniform(0.5, 1.5) if self.latency else 0
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise PaymentError("Injected payment provider failure")
+
+    @staticmethod
+    def _id(prefix):
+        return f"{prefix}_fake_{uuid.uuid4().hex[:24]}"
+
+    def create_checkout_session(self, **params):
+        self._simulate()
+        session_id = self._id("cs")
+        amount = sum(item["price_data"]["unit_amount"] * item.get("quantity", 1) for item in params["line_items"])
+        session = SimpleNamespace(
+            id=session_id,
+            url=f"https://checkout.fake.local/pay/{session_id}",
+            payment_status="unpaid",
+            amount_total=amount,
+            currency=params["line_items"][0]["price_data"]["currency"] if params["line_items"] else "usd",
+        )
+        with self._lock:
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        return session
+
+    def retrieve_checkout_session(self, session_id):
+        self._simulate()
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise PaymentError(f"No such checkout.session: {session_id}")
+        return session
+
+    def create_account(self, **params):
+        self._simulate()
+        return SimpleNamespace(id=self._id("acct"), email=params.get("email"))
+
+    def create_account_link(self, **params):
+        self._simulate()
+        return SimpleNamespace(url=f"https://connect.fake.local/onboarding/{params['account']}")
+
+    def complete_checkout_session(self, session_id):
+        """Mark a session paid, as if the buyer paid; returns (payload, signature header) for the webhook."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise PaymentError(f"No such checkout.session: {session_id}")
+        session.payment_status = "paid"
+        return self.sign_event("checkout.session.completed", {
+            "id": session.id,
+            "object": "checkout.session",
+            "payment_status": "paid",
+            "amount_total": session.amount_total,
+            "currency": session.currency,
+        })
+
+    def sign_event(self, event_type, obj):
+        """Serialize an event and sign it with the webhook secret in Stripe's format."""
+        payload = json.dumps({
+            "id": self._id("evt"),
+            "object": "event",
+            "type": event_type,
+            "created": int(time.time()),
+            "data": {"object": obj},
+        }).encode("utf-8")
+        timestamp = int(time.time())
+        return payload, f"t={timestamp},v1={self._signature(timestamp, payload, self.webhook_secret)}"
+
+    @staticmethod
+    def _signature(timestamp, payload, secret):
+        message = f"{timestamp}.".encode("utf-8") + payload
+        return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    def construct_event(self, payload, sig_header, secret):
+        secret = secret or self.webhook_secret
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        try:
+            parts = dict(item.split("=", 1) for item in (sig_header or "").split(","))
+            timestamp = int(parts["t"])
+        except (KeyError, ValueError):
+            raise SignatureError("Unable to extract timestamp and signatures from header")
+        if abs(time.time() - timestamp) > SIGNATURE_TOLERANCE:
+            raise SignatureError("Timestamp outside the tolerance zone")
+        if not hmac.compare_digest(self._signature(timestamp, payload, secret), parts.get("v1", "")):
+            raise SignatureError("No signatures found matching the expected signature for payload")
+        return json.loads(payload)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "failures": self.failures, "sessions": len(self._sessions)}
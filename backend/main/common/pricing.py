@@ -0,0 +1,137 @@
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from collections import OrderedDict
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from main.database.models import db, CartItem, Product, Coupon, User
+
+CURRENCY = "usd"
+APPLICATION_FEE_PERCENT = 10
+QUOTE_SALT = "checkout-quote"
+
+
+def to_cents(amount):
+    # Through str() so 19.99 becomes 1999, not 1998 from float error
+    return int((Decimal(str(amount)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return cents / 100
+
+
+def apply_discount(cents, percent):
+    """Price after a percent discount, rounded half up to the cent."""
+    return (cents * (100 - percent) + 50) // 100
+
+
+def application_fee(total_cents):
+    return total_cents * APPLICATION_FEE_PERCENT // 100
+
+
+def load_cart_products(user_id):
+    """The buyer's cart products in cart order, deleted ones included, in one query."""
+    return (
+        Product.query
+        .join(CartItem, CartItem.product_id == Product.id)
+        .filter(CartItem.buyer_id == user_id)
+        .order_by(CartItem.id)
+        .all()
+    )
+
+
+def load_sellers(seller_ids):
+    if not seller_ids:
+        return {}
+    return {user.id: user for user in User.query.filter(User.id.in_(set(seller_ids))).all()}
+
+
+def load_coupons(codes_by_product):
+    """Valid coupons for a {product_id: code} mapping, keyed by product id, in one query."""
+    codes_by_product = {int(pid): code for pid, code in codes_by_product.items() if code}
+    if not codes_by_product:
+        return {}
+    coupons = Coupon.query.filter(Coupon.code.in_(set(codes_by_product.values()))).all()
+    return {
+        coupon.product_id: coupon for coupon in coupons
+        if codes_by_product.get(coupon.product_id) == coupon.code and coupon.is_valid()
+    }
+
+
+def price_cart(user_id, coupon_codes=None):
+    """Price the buyer's whole cart with a fixed number of queries.
+
+    Cart and products, sellers and coupons are each loaded in one query and
+    all amounts are integer cents. Items are grouped per seller, since each
+    seller is paid through their own checkout session; items that can't be
+    bought are listed under "skipped" with a reason.
+    """
+    try:
+        coupon_codes = {int(pid): code for pid, code in (coupon_codes or {}).items()}
+    except (TypeError, ValueError):
+        coupon_codes = {}
+
+    products = load_cart_products(user_id)
+    sellers = load_sellers([p.seller_id for p in products if not p.is_deleted])
+    coupons = load_coupons({p.id: coupon_codes.get(p.id) for p in products if not p.is_deleted})
+
+    groups = OrderedDict()
+    skipped = []
+    for product in products:
+        if product.is_deleted:
+            skipped.append({"product_id": product.id, "reason": "unavailable"})
+            continue
+        seller = sellers.get(product.seller_id)
+        if not seller or not seller.stripe_account_id:
+            skipped.append({"product_id": product.id, "reason": "seller_cannot_accept_payments"})
+            continue
+
+        unit_cents = to_cents(product.price)
+        coupon = coupons.get(product.id)
+        discount = coupon.discount_percent if coupon else 0
+        group = groups.setdefault(product.seller_id, {"seller_id": product.seller_id, "items": [], "total_cents": 0})
+        group["items"].append({
+            "product_id": product.id,
+            "title": product.title,
+            "unit_cents": unit_cents,
+            "coupon_code": coupon.code if coupon else None,
+            "discount_percent": discount,
+            "price_cents": apply_discount(unit_cents, discount),
+        })
+        group["total_cents"] += group["items"][-1]["price_cents"]
+
+    for group in groups.values():
+        group["fee_cents"] = application_fee(group["total_cents"])
+
+    return {
+        "buyer_id": user_id,
+        "currency": CURRENCY,
+        "product_ids": sorted(p.id for p in products),
+        "sellers": list(groups.values()),
+        "skipped": skipped,
+        "total_cents": sum(g["total_cents"] for g in groups.values()),
+        "expires_at": int(time.time()) + current_app.config["CHECKOUT_QUOTE_TTL"],
+    }
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=QUOTE_SALT)
+
+
+def sign_quote(quote):
+    """Opaque token for a quote; it is signed, not encrypted, so it holds nothing private."""
+    return _serializer().dumps(quote)
+
+
+def load_quote(token, user_id):
+    """Return the quote in token if it is authentic, unexpired and was issued to user_id, else None."""
+    try:
+        quote = _serializer().loads(token, max_age=current_app.config["CHECKOUT_QUOTE_TTL"])
+    except (BadSignature, SignatureExpired):
+        return None
+    if quote.get("buyer_id") != user_id:
+        return None
+    return quote
+
+
+def cart_product_ids(user_id):
+    return sorted(pid for (pid,) in db.session.query(CartItem.product_id).filter_by(buyer_id=user_id))
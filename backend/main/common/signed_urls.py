@@ -0,0 +1,39 @@
+import hmac
+import time
+import base64
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, urlencode, parse_qsl
+
+
+def _signature(path, expires, key):
+    message = f"{path}\n{expires}".encode("utf-8")
+    digest = hmac.new(key.encode("utf-8"), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def sign_url(url, key, expires_in, base_url=None):
+    """Return (signed_url, expires_at) for url, valid for expires_in seconds.
+
+    The signature covers the URL path and expiry, so whatever serves base_url
+    (a CDN edge, nginx secure_link, or our own local-file route) only needs
+    the shared key to check it. base_url replaces the scheme and host of url.
+    """
+    expires = int(time.time()) + int(expires_in)
+    parts = urlsplit(url)
+    if base_url:
+        base = urlsplit(base_url)
+        parts = parts._replace(scheme=base.scheme, netloc=base.netloc, path=base.path.rstrip("/") + parts.path)
+
+    query = parse_qsl(parts.query) + [("expires", str(expires)), ("signature", _signature(parts.path, expires, key))]
+    return urlunsplit(parts._replace(query=urlencode(query))), expires
+
+
+def verify_signature(path, expires, signature, key):
+    """True if signature is valid for path and hasn't expired."""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(path, expires, key), signature or "")
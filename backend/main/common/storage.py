@@ -0,0 +1,127 @@
+import os
+import uuid
+import shutil
+import mimetypes
+from urllib.parse import quote, urlsplit
+from flask import current_app, request, Response
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as werkzeug_send_file
+from main.common.cloudinary_helper import upload_to_cloudinary
+
+COPY_CHUNK = 1024 * 1024
+PUBLIC_FOLDERS = ("previews",)  # served to anyone; other folders need a signed URL
+
+
+def content_disposition(filename):
+    try:
+        filename.encode("ascii")
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        fallback = filename.encode("ascii", "ignore").decode("ascii") or "download"
+        return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def upload_file(file, folder="products", filename=None):
+    """Store file with the configured STORAGE_BACKEND and return its URL.
+
+    file can be a local path or a file object, as for upload_to_cloudinary.
+    """
+    if current_app.config["STORAGE_BACKEND"] == "local":
+        return save_local(file, folder=folder, filename=filename)
+    return upload_to_cloudinary(file, folder=folder, filename=filename)
+
+
+def save_local(file, folder="products", filename=None):
+    """Write file under STORAGE_ROOT/<folder>/<xx>/<yy>/ and return its URL.
+
+    Names are random hex, and their first two byte pairs pick the shard
+    directories so no directory grows past a few thousand entries. The file
+    is written to a .part name and renamed, so readers never see it half done.
+    """
+    name = filename or (file if isinstance(file, str) else getattr(file, "name", None)) or ""
+    ext = os.path.splitext(str(name))[1].lower()
+    key = uuid.uuid4().hex
+    relative = f"{folder}/{key[:2]}/{key[2:4]}/{key}{ext}"
+
+    path = os.path.join(current_app.config["STORAGE_ROOT"], *relative.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".part"
+    try:
+        if isinstance(file, str):
+            shutil.copyfile(file, tmp_path)
+        else:
+            if hasattr(file, "seek"):
+                file.seek(0)
+            with open(tmp_path, "wb") as out:
+                shutil.copyfileobj(file, out, COPY_CHUNK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return current_app.config["STORAGE_URL_BASE"].rstrip("/") + "/" + relative
+
+
+def local_key(url):
+    """Storage key ("<folder>/xx/yy/name") of a URL made by save_local(), or None for remote URLs."""
+    if not url:
+        return None
+    base = urlsplit(current_app.config["STORAGE_URL_BASE"])
+    parts = urlsplit(url)
+    if parts.netloc and base.netloc and parts.netloc != base.netloc:
+        return None
+    prefix = base.path.rstrip("/") + "/"
+    if not parts.path.startswith(prefix):
+        return None
+    return parts.path[len(prefix):]
+
+
+def local_path(url):
+    """Absolute path of a locally stored file's URL, or None if it is remote or missing."""
+    return stored_path(local_key(url))
+
+
+def stored_path(key):
+    """Absolute path for a storage key, or None if it doesn't name an existing file."""
+    if not key:
+        return None
+    path = safe_join(current_app.config["STORAGE_ROOT"], key)  # None on traversal attempts
+    if not path or not os.path.isfile(path):
+        return None
+    return path
+
+
+def send_local_file(path, download_name=None, mimetype=None, max_age=None, etag=None):
+    """Response for a file under STORAGE_ROOT, with Range and conditional request support.
+
+    STORAGE_SENDFILE picks who moves the bytes: 'sendfile' lets the WSGI
+    server copy the file to the socket (os.sendfile under gunicorn), 'xsendfile'
+    and 'accel' hand the path to Apache/lighttpd or nginx and send no body.
+    etag replaces the default (mtime/size based) ETag with a strong one.
+    """
+    mode = current_app.config["STORAGE_SENDFILE"]
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if mode == "accel":
+        relative = os.path.relpath(path, current_app.config["STORAGE_ROOT"]).replace(os.sep, "/")
+        response = Response(status=200, mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = current_app.config["STORAGE_ACCEL_PREFIX"].rstrip("/") + "/" + relative
+        if download_name:
+            response.headers["Content-Disposition"] = content_disposition(download_name)
+        if etag:
+            response.set_etag(etag)
+        return response
+
+    return werkzeug_send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=bool(download_name),
+        download_name=download_name,
+        conditional=True,
+        etag=etag or True,
+        use_x_sendfile=mode == "xsendfile",
+        response_class=current_app.response_class,
+        max_age=max_age
+    )
@@ -0,0 +1,234 @@
+import json
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update, or_, and_, func
+from sqlalchemy.exc import IntegrityError
+from main.extension import db
+from main.database.models import WebhookEvent, Order, Payout, CartItem
+from main.v1.buyer.dashboard.downloads.download_resource import invalidate_download_library
+from main.common.outbox import record_order_event
+
+MAX_RETRY_DELAY = timedelta(hours=1)
+UNFINISHED = ("pending", "processing")
+
+_wakeup = threading.Event()
+
+
+def handle_checkout_completed(event):
+    """Mark the session's order paid, clear those cart items and create payouts.
+
+    Runs inside the consumer's transaction; returns a callback to run after
+    commit. Raising retries the event later, e.g. when the webhook beat the
+    checkout's own commit.
+    """
+    session_id = event["data"]["object"].get("id")
+    order = Order.query.filter_by(stripe_payment_id=session_id).first()
+    if not order:
+        raise Exception(f"Order for session {session_id} not found")
+
+    if order.status == "paid":
+        return None
+
+    order.status = "paid"
+    record_order_event(order, "order.paid", stripe_session_id=session_id)
+
+    # Clear buyer's cart (only the purchased products)
+    product_ids = [item.product_id for item in order.items]
+    CartItem.query.filter(
+        CartItem.buyer_id == order.buyer_id,
+        CartItem.product_id.in_(product_ids)
+    ).delete(synchronize_session=False)
+
+    # Calculate and create payouts (items carry their seller)
+    seller_earnings = {}
+    for item in order.items:
+        seller_earnings[item.seller_id] = seller_earnings.get(item.seller_id, 0) + item.price
+
+    for seller_id, gross_amount in seller_earnings.items():
+        platform_fee = round(gross_amount * 0.10, 2)
+        net_amount = round(gross_amount - platform_fee, 2)
+
+        # Avoid duplicate payouts
+        existing_payout = Payout.query.filter_by(
+            seller_id=seller_id,
+            amount=net_amount,
+            status="paid"
+        ).first()
+
+        if not existing_payout:
+            db.session.add(Payout(
+                seller_id=seller_id,
+                amount=net_amount,
+                status="paid",
+                date=datetime.utcnow()
+            ))
+
+    buyer_id = order.buyer_id
+    return lambda: invalidate_download_library(buyer_id)
+
+
+HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+}
+
+
+def record_webhook_event(event):
+    """Persist a verified event for the consumer; False if the event id was already stored."""
+    obj = event.get("data", {}).get("object", {})
+    db.session.add(WebhookEvent(
+        provider_event_id=event["id"],
+        event_type=event["type"],
+        object_id=obj.get("id"),
+        payload=json.dumps(event),
+        status="pending",
+        attempts=0,
+        received_at=datetime.utcnow(),
+        next_attempt_at=datetime.utcnow()
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    _wakeup.set()
+    return True
+
+
+def _claim(event_id, now, lease):
+    """Take an event for processing; False if another consumer got it first."""
+    return db.session.execute(
+        update(WebhookEvent)
+        .where(
+            WebhookEvent.id == event_id,
+            or_(
+                WebhookEvent.status == "pending",
+                and_(WebhookEvent.status == "processing", WebhookEvent.locked_at < now - lease)
+            )
+        )
+        .values(status="processing", locked_at=now, attempts=WebhookEvent.attempts + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def process_pending_events(batch_size=50, max_attempts=8, retry_base=2, lease_seconds=300):
+    """Process one batch of due events; returns how many were attempted.
+
+    Events are taken oldest first. An event waits while an earlier event for
+    the same object (checkout session) is still unfinished, so events for one
+    order apply in the order they were received. Each event's effects and
+    its status change commit together. Failures back off exponentially and
+    go to 'dead' after max_attempts.
+    """
+    now = datetime.utcnow()
+    lease = timedelta(seconds=lease_seconds)
+    candidates = (
+        WebhookEvent.query
+        .filter(or_(
+            and_(WebhookEvent.status == "pending", WebhookEvent.next_attempt_at <= now),
+            and_(WebhookEvent.status == "processing", WebhookEvent.locked_at < now - lease)
+        ))
+        .order_by(WebhookEvent.id)
+        .limit(batch_size)
+        .all()
+    )
+    if not candidates:
+        return 0
+
+    object_ids = {e.object_id for e in candidates if e.object_id}
+    first_unfinished = dict(
+        db.session.query(WebhookEvent.object_id, func.min(WebhookEvent.id))
+        .filter(WebhookEvent.object_id.in_(object_ids), WebhookEvent.status.in_(UNFINISHED))
+        .group_by(WebhookEvent.object_id)
+        .all()
+    ) if object_ids else {}
+
+    attempted = 0
+    for event_id, object_id in [(e.id, e.object_id) for e in candidates]:
+        if object_id and first_unfinished.get(object_id) != event_id:
+            continue  # an earlier event for this object goes first
+        if not _claim(event_id, now, lease):
+            db.session.rollback()
+            continue
+        db.session.commit()
+        attempted += 1
+
+        event = db.session.get(WebhookEvent, event_id)
+        try:
+            handler = HANDLERS.get(event.event_type)
+            after_commit = handler(json.loads(event.payload)) if handler else None
+            event.status = "processed"
+            event.processed_at = datetime.utcnow()
+            event.locked_at = None
+            event.last_error = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            event = db.session.get(WebhookEvent, event_id)
+            event.last_error = str(e)
+            event.locked_at = None
+            if event.attempts >= max_attempts:
+                event.status = "dead"
+            else:
+                event.status = "pending"
+                event.next_attempt_at = datetime.utcnow() + min(
+                    timedelta(seconds=retry_base * 2 ** (event.attempts - 1)), MAX_RETRY_DELAY
+                )
+            db.session.commit()
+            continue
+
+        if after_commit:
+            after_commit()
+
+    return attempted
+
+
+def event_counts():
+    """Stored events per status, e.g. to watch the pending backlog and dead events."""
+    return dict(db.session.query(WebhookEvent.status, func.count(WebhookEvent.id)).group_by(WebhookEvent.status).all())
+
+
+def _process_with_config(app):
+    config = app.config
+    return process_pending_events(
+        batch_size=config["WEBHOOK_BATCH_SIZE"],
+        max_attempts=config["WEBHOOK_MAX_ATTEMPTS"],
+        retry_base=config["WEBHOOK_RETRY_BASE"],
+        lease_seconds=config["WEBHOOK_LEASE_SECONDS"]
+    )
+
+
+def start_webhook_consumer(app):
+    """Run the consumer in a daemon thread (a greenlet under gevent) for this process."""
+    def run():
+        while True:
+            _wakeup.wait(app.config["WEBHOOK_POLL_INTERVAL"])
+            _wakeup.clear()
+            with app.app_context():
+                try:
+                    while _process_with_config(app):
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print("Webhook consumer error:", str(e))
+
+    thread = threading.Thread(target=run, name="webhook-consumer", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("process-webhooks")
+@click.option("--once", is_flag=True, help="Drain due events and exit instead of polling.")
+@with_appcontext
+def process_webhooks_command(once):
+    """Process stored payment webhook events (for a dedicated consumer process)."""
+    app = current_app._get_current_object()
+    while True:
+        while _process_with_config(app):
+            pass
+        if once:
+            break
+        _wakeup.wait(app.config["WEBHOOK_POLL_INTERVAL"])
+        _wakeup.clear()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import click
+from flask.cli import with_appcontext
+from main.extension import db
+from main.database.models import Product
+from main.common import http_client
+from main.common.lossless import wav_to_flac, pcm_md5
+from main.common.storage import upload_file, local_path
+
+FETCH_CHUNK = 1024 * 1024
+
+
+def _fetch(url):
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as f, http_client.get(url, stream=True, headers={"Accept-Encoding": "identity"}) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=FETCH_CHUNK):
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def compact_product(product, dry_run=False):
+    """Replace one product's WAV master with a verified FLAC; returns (bytes_before, bytes_after) or None if skipped."""
+    old_url = product.file_url
+    old_local = local_path(old_url)
+    source = old_local or _fetch(old_url)
+    flac_path = None
+    try:
+        flac_path = wav_to_flac(source)
+        if not flac_path:
+            return None
+        # Never swap a master unless the decoded samples are identical
+        if pcm_md5(source) != pcm_md5(flac_path):
+            raise Exception("decoded FLAC does not match the WAV")
+
+        sizes = os.path.getsize(source), os.path.getsize(flac_path)
+        if dry_run:
+            return sizes
+
+        product.file_url = upload_file(flac_path, filename=f"product_{product.id}.flac")
+        product.original_format = "wav"
+        db.session.commit()
+
+        # Old local masters are removed once nothing points at them; remote ones are left to the provider
+        if old_local:
+            os.remove(old_local)
+        return sizes
+    finally:
+        if flac_path:
+            os.remove(flac_path)
+        if source != old_local:
+            os.remove(source)
+
+
+def compact_wav_products(batch_size=20, limit=None, dry_run=False, log=print):
+    """Convert stored WAV masters to FLAC in id-ordered batches; returns a summary dict.
+
+    Each product is committed on its own, so an interrupted run keeps its
+    progress and a rerun picks up the WAVs that are left.
+    """
+    summary = {"compacted": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    seen = 0
+    while limit is None or seen < limit:
+        size = batch_size if limit is None else min(batch_size, limit - seen)
+        batch = (
+            Product.query
+            .filter(Product.id > last_id, Product.file_url.ilike("%.wav"))
+            .order_by(Product.id)
+            .limit(size)
+            .all()
+        )
+        if not batch:
+            break
+
+        for product in batch:
+            last_id = product.id
+            seen += 1
+            try:
+                sizes = compact_product(product, dry_run=dry_run)
+            except Exception as e:
+                db.session.rollback()
+                summary["failed"] += 1
+                log(f"product {product.id}: failed: {e}")
+                continue
+
+            if sizes is None:
+                summary["skipped"] += 1
+                log(f"product {product.id}: skipped (not a FLAC-compatible WAV)")
+                continue
+
+            summary["compacted"] += 1
+            summary["bytes_before"] += sizes[0]
+            summary["bytes_after"] += sizes[1]
+            log(f"product {product.id}: {sizes[0]} -> {sizes[1]} bytes")
+
+        db.session.expunge_all()  # keep the identity map from growing with every batch
+
+    return summary
+
+
+@click.command("compact-wav")
+@click.option("--batch-size", default=20, show_default=True, help="Products loaded per query.")
+@click.option("--limit", type=int, default=None, help="Stop after this many products.")
+@click.option("--dry-run", is_flag=True, help="Transcode and verify, but don't replace anything.")
+@with_appcontext
+def compact_wav_command(batch_size, limit, dry_run):
+    """Store existing WAV masters as FLAC (downloads can still rebuild the WAV)."""
+    summary = compact_wav_products(batch_size=batch_size, limit=limit, dry_run=dry_run, log=click.echo)
+    saved = summary["bytes_before"] - summary["bytes_after"]
+    click.echo(
+        f"compacted {summary['compacted']}, skipped {summary['skipped']}, failed {summary['failed']}; "
+        f"{summary['bytes_before']} -> {summary['bytes_after']} bytes ({saved} saved)"
+    )
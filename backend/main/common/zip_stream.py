@@ -0,0 +1,102 @@
+import io
+import queue
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from main.common import http_client
+
+CHUNK_SIZE = 64 * 1024
+PREFETCH_CHUNKS = 16  # per entry, so memory is ~concurrency * 1MB whatever the file sizes
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file that hands written bytes to the generator.
+
+    zipfile sees no seek() and falls back to data descriptors, so entries can
+    be written without knowing their size or CRC up front.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def _read_source(source):
+    if source.startswith(("http://", "https://")):
+        with http_client.get(source, stream=True, headers={"Accept-Encoding": "identity"}) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size=CHUNK_SIZE)
+    else:
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+
+def _prefetch(source, chunks, cancelled):
+    """Read source into a bounded queue; ends with None, or the exception raised."""
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for chunk in _read_source(source):
+            if chunk and not put(chunk):
+                return
+        put(None)
+    except Exception as e:
+        put(e)
+
+
+def stream_zip(entries, concurrency=4):
+    """Yield a ZIP archive of (name, source) entries as it is built.
+
+    A source is an http(s) URL or a local file path.
+
+    Up to `concurrency` entries are fetched ahead of the writer, each into a
+    bounded queue, and entries are STORED (audio doesn't compress). If the
+    consumer stops early, pending fetches are cancelled.
+    """
+    entries = list(entries)
+    cancelled = threading.Event()
+    queues = [queue.Queue(maxsize=PREFETCH_CHUNKS) for _ in entries]
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    for (_, source), chunks in zip(entries, queues):
+        executor.submit(_prefetch, source, chunks, cancelled)
+
+    sink = _ChunkSink()
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for (name, _), chunks in zip(entries, queues):
+                with archive.open(name, mode="w", force_zip64=True) as entry:
+                    while True:
+                        chunk = chunks.get()
+                        if chunk is None:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        entry.write(chunk)
+                        yield from sink.drain()
+                yield from sink.drain()
+        yield from sink.drain()
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 load_dotenv()  # Load .env file
 
@@ -25,6 +26,42 @@ class Config:
     STRIPE_PUBLISHABLE_KEY = os.environ.get("STRIPE_PUBLISHABLE_KEY")
     STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
 
+    # 'stripe', or 'fake' for the in-process stand-in used in load tests (see main/common/payments.py)
+    PAYMENT_PROVIDER = os.environ.get("PAYMENT_PROVIDER", "stripe")
+    FAKE_PAYMENT_LATENCY = float(os.environ.get("FAKE_PAYMENT_LATENCY", 0.05))  # seconds per call, +/-50%
+    FAKE_PAYMENT_FAILURE_RATE = float(os.environ.get("FAKE_PAYMENT_FAILURE_RATE", 0))
+    CHECKOUT_QUOTE_TTL = int(os.environ.get("CHECKOUT_QUOTE_TTL", 300))  # seconds a signed checkout quote stays valid
+    CHECKOUT_SESSION_CONCURRENCY = int(os.environ.get("CHECKOUT_SESSION_CONCURRENCY", 4))  # sellers' sessions created in parallel
+    CHECKOUT_SESSION_TIMEOUT = float(os.environ.get("CHECKOUT_SESSION_TIMEOUT", 15))  # seconds for all of a checkout's sessions
+
+    # Background jobs below default to 'off' in web processes: run them in one
+    # dedicated process with `python worker.py` (or their flask commands). 'thread'
+    # starts one in every app process instead; CLI commands never start them.
+
+    # Payment webhooks are stored, acknowledged, then applied by a consumer.
+    # 'thread' or 'off' (use worker.py or `flask process-webhooks`)
+    WEBHOOK_CONSUMER = os.environ.get("WEBHOOK_CONSUMER", "off")
+    WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", 50))
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", 8))  # then the event is marked dead
+    WEBHOOK_RETRY_BASE = float(os.environ.get("WEBHOOK_RETRY_BASE", 2))  # seconds, doubled per attempt
+    WEBHOOK_POLL_INTERVAL = float(os.environ.get("WEBHOOK_POLL_INTERVAL", 1.0))
+    WEBHOOK_LEASE_SECONDS = int(os.environ.get("WEBHOOK_LEASE_SECONDS", 300))  # a claimed event is retaken after this
+
+    # Order lifecycle events, written with each order change and handed to the @subscribe
+    # handlers of the one process relaying them (see main/common/outbox.py); 'thread' or
+    # 'off' (use worker.py or `flask relay-outbox`)
+    OUTBOX_RELAY = os.environ.get("OUTBOX_RELAY", "off")
+    OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+    OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 1.0))
+    OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", 7))  # published events are then deleted
+
+    # Pending orders older than a checkout session's lifetime (Stripe's default is 24h) are
+    # marked 'expired'; 'thread' or 'off' (use worker.py or `flask expire-orders`)
+    ORDER_SWEEPER = os.environ.get("ORDER_SWEEPER", "off")
+    PENDING_ORDER_TTL = int(os.environ.get("PENDING_ORDER_TTL", 24 * 3600))  # seconds
+    ORDER_SWEEP_INTERVAL = float(os.environ.get("ORDER_SWEEP_INTERVAL", 300))  # seconds between sweeps
+    ORDER_SWEEP_BATCH_SIZE = int(os.environ.get("ORDER_SWEEP_BATCH_SIZE", 200))  # orders per UPDATE
+
     # Uploads
     UPLOAD_FOLDER = os.path.join(basedir, "uploads")
     # MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100 MB for development 
@@ -35,6 +72,72 @@ class Config:
     CLOUDINARY_API_KEY = os.environ.get("CLOUDINARY_API_KEY")
     CLOUDINARY_API_SECRET = os.environ.get("CLOUDINARY_API_SECRET")
 
+    # Media storage: 'cloudinary', or 'local' to keep files under STORAGE_ROOT,
+    # served from STORAGE_URL_BASE (the /media route, or nginx/CDN in front of it)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "cloudinary")
+    STORAGE_ROOT = os.environ.get("STORAGE_ROOT", UPLOAD_FOLDER)
+    STORAGE_URL_BASE = os.environ.get("STORAGE_URL_BASE", "/media")
+    # Local files: 'sendfile' (WSGI server, zero-copy under gunicorn), 'xsendfile'
+    # (X-Sendfile for Apache/lighttpd) or 'accel' (X-Accel-Redirect to STORAGE_ACCEL_PREFIX)
+    STORAGE_SENDFILE = os.environ.get("STORAGE_SENDFILE", "sendfile")
+    STORAGE_ACCEL_PREFIX = os.environ.get("STORAGE_ACCEL_PREFIX", "/protected-media")
+
+    # App profile: 'full' serves every route, 'api' skips the audio upload route and
+    # refuses replacement files on product updates, so those workers never load librosa/numpy/ffmpeg
+    APP_PROFILE = os.environ.get("APP_PROFILE", "full")
+
+    # Audio pipeline: 'tempfile' writes upload/preview to disk, 'pipe' streams
+    # through ffmpeg stdin/stdout and only spills uploads larger than the spool size
+    AUDIO_PIPELINE_MODE = os.environ.get("AUDIO_PIPELINE_MODE", "tempfile")
+    AUDIO_SPOOL_MAX_BYTES = int(os.environ.get("AUDIO_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
+
+    # On-demand preview clips (/buyer/products/<id>/clip)
+    CLIP_CACHE_DIR = os.environ.get("CLIP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "clip_cache"))
+    CLIP_CACHE_MAX_BYTES = int(os.environ.get("CLIP_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    CLIP_START_STEP = 5  # seconds; starts are rounded down to a multiple so clips are shared
+    CLIP_LENGTHS = (15, 30)  # seconds; a requested len is rounded up to one of these
+    CLIP_BITRATE = "64k"
+    # The endpoint is public, so ffmpeg runs for cache misses are capped per worker
+    CLIP_MAX_CONCURRENT = int(os.environ.get("CLIP_MAX_CONCURRENT", 2))
+    CLIP_QUEUE_TIMEOUT = float(os.environ.get("CLIP_QUEUE_TIMEOUT", 5))  # seconds to wait for a free slot
+    CLIP_RETRY_AFTER = int(os.environ.get("CLIP_RETRY_AFTER", 5))
+
+    # Paid downloads: 'proxy' streams through the worker, 'signed' returns a
+    # short-lived HMAC-signed URL on DOWNLOAD_URL_BASE (an edge that shares
+    # DOWNLOAD_SIGNING_KEY; required for remote files, local ones can use /media),
+    # 'accel' hands off to nginx via X-Accel-Redirect. Set per deployment, never per request
+    DOWNLOAD_DELIVERY = os.environ.get("DOWNLOAD_DELIVERY", "proxy")
+    DOWNLOAD_SIGNING_KEY = os.environ.get("DOWNLOAD_SIGNING_KEY")
+    DOWNLOAD_URL_BASE = os.environ.get("DOWNLOAD_URL_BASE")
+    DOWNLOAD_URL_TTL = int(os.environ.get("DOWNLOAD_URL_TTL", 300))
+    DOWNLOAD_ACCEL_PREFIX = os.environ.get("DOWNLOAD_ACCEL_PREFIX", "/protected")
+
+    # Local disk cache for proxied downloads of hot files (0 disables it)
+    DOWNLOAD_CACHE_DIR = os.environ.get("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "download_cache"))
+    DOWNLOAD_CACHE_MAX_BYTES = int(os.environ.get("DOWNLOAD_CACHE_MAX_BYTES", 0))
+    BUNDLE_FETCH_CONCURRENCY = int(os.environ.get("BUNDLE_FETCH_CONCURRENCY", 4))  # files fetched ahead per ZIP bundle
+
+    # Invoice PDFs, rendered once per paid order and stored under STORAGE_ROOT/invoices
+    INVOICE_BATCH_MAX = int(os.environ.get("INVOICE_BATCH_MAX", 500))  # invoices per ZIP
+    INVOICE_RETRY_AFTER = int(os.environ.get("INVOICE_RETRY_AFTER", 10))  # seconds, while the worker renders one
+
+    # Download scheduler for streams served by this worker (proxy, cache, bundles)
+    DOWNLOAD_MAX_STREAMS = int(os.environ.get("DOWNLOAD_MAX_STREAMS", 50))
+    DOWNLOAD_MAX_STREAMS_PER_USER = int(os.environ.get("DOWNLOAD_MAX_STREAMS_PER_USER", 3))
+    DOWNLOAD_MAX_QUEUED = int(os.environ.get("DOWNLOAD_MAX_QUEUED", 100))
+    DOWNLOAD_QUEUE_TIMEOUT = float(os.environ.get("DOWNLOAD_QUEUE_TIMEOUT", 10))  # seconds to wait for a free stream
+    DOWNLOAD_RETRY_AFTER = int(os.environ.get("DOWNLOAD_RETRY_AFTER", 5))
+    DOWNLOAD_BANDWIDTH_BYTES = int(os.environ.get("DOWNLOAD_BANDWIDTH_BYTES", 0))  # bytes/s shared by all streams, 0 = unpaced
+
+    # Shared outbound HTTP client (storage, Stripe, Cloudinary)
+    HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", 10))  # per-host pools kept alive
+    HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 20))  # keep-alive connections per host
+    HTTP_POOL_BLOCK = os.environ.get("HTTP_POOL_BLOCK", "false").lower() == "true"
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+    HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+    HTTP_RETRY_BACKOFF = float(os.environ.get("HTTP_RETRY_BACKOFF", 0.3))
+
 
 
 # import os
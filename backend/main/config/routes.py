@@ -1,17 +1,17 @@
 from flask_restful import Api
 from main.common.auth.auth_resource import UserRegistrationResource, UserLoginResource, UserProfileResource
 from main.v1.seller.dashboard.products.product_resource import UploadProductResource, SellerProductListResource, SellerSingleProductResource, ProductUpdateResource, ProductDeleteResource
-from main.v1.buyer.dashboard.products.product_resource import ProductListResource, ProductDetailResource
+from main.v1.buyer.dashboard.products.product_resource import ProductListResource, ProductDetailResource, ProductClipResource
 from main.v1.buyer.dashboard.cart.cart_resource import AddToCartResource, ViewCartResource, RemoveCartItemResource
-from main.v1.buyer.dashboard.checkout.checkout_resource import ApplyCouponResource, CheckoutResource
+from main.v1.buyer.dashboard.checkout.checkout_resource import ApplyCouponResource, CheckoutQuoteResource, CheckoutResource
 from main.v1.seller.dashboard.coupons.coupon_resource import SellerCouponResource, SellerCouponDetailResource
 from main.v1.buyer.dashboard.coupons.coupon_resource import BuyerCouponResource
 from main.v1.seller.dashboard.payouts.payout_resource import RecordPayoutResource, SellerPayoutsResource
-from main.v1.buyer.dashboard.downloads.download_resource import BuyerDownloadListResource, BuyerDownloadFileResource
+from main.v1.buyer.dashboard.downloads.download_resource import BuyerDownloadListResource, BuyerDownloadFileResource, BuyerDownloadBundleResource
 from main.v1.seller.dashboard.sales_report.sales_report_resource import SellerAllSalesResource, SellerProductSalesResource
 from main.v1.seller.dashboard.dashboard_resource import SellerDashboardResource
 from main.v1.seller.dashboard.orders.order_resource import SellerOrdersResource, SellerOrderDetailResource
-from main.v1.buyer.dashboard.orders.order_resource import BuyerOrdersResource, BuyerOrderDetailResource, BuyerOrderInvoiceResource, BuyerCancelOrderResource, BuyerCancelPendingOrderResource, BuyerRetryCheckoutResource
+from main.v1.buyer.dashboard.orders.order_resource import BuyerOrdersResource, BuyerOrderDetailResource, BuyerOrderInvoiceResource, BuyerInvoiceBatchResource, BuyerCancelOrderResource, BuyerCancelPendingOrderResource, BuyerRetryCheckoutResource
 from main.common.stripe.webhook_resource import StripeWebhookResource
 from main.v1.buyer.dashboard.cart.cart_resource import CartCountResource
 from main.v1.buyer.dashboard.search.search_history import SearchHistoryResource
@@ -22,6 +22,8 @@ from main.v1.admin.dashboard.usersList.userlist_resource import SellerListResour
 from main.v1.admin.dashboard.seller_approvel.seller_approvel_resource import ApproveSellerResource
 from main.v1.admin.dashboard.reports.report_resource import AdminReportListResource
 from main.v1.admin.dashboard.user_actions.user_action_resource import BlockUserResource, UnblockUserResource, DeleteUserResource, RecoverUserResource, HardDeleteUserResource, TrashCountResource
+from main.v1.admin.dashboard.metrics.metrics_resource import AdminMetricsResource
+from main.common.media.media_resource import MediaFileResource
 from main.chat_routes import ChatResource, MarkAsReadResource, StartChatResource
 from main.chat_list import ChatListResource
 
@@ -31,6 +33,9 @@ def register_routes(app):
 
     api.add_resource(StripeWebhookResource, "/stripe/webhook")
 
+    # Files kept by the local storage backend (STORAGE_URL_BASE points here by default)
+    api.add_resource(MediaFileResource, '/media/<path:key>')
+
     # Chat Resource
     api.add_resource(ChatResource, '/chat/<int:target_id>')
     api.add_resource(ChatListResource, '/chat-list')
@@ -44,10 +49,13 @@ def register_routes(app):
     api.add_resource(UserProfileResource, '/auth/profile')
 
     # **** Sellers Product Resources ****
-    api.add_resource(UploadProductResource, '/seller/products/upload')
+    # Upload runs the audio pipeline, so API-only workers don't serve it; they do
+    # serve metadata updates, and refuse only a replacement file (see ProductUpdateResource)
+    if app.config.get("APP_PROFILE") != "api":
+        api.add_resource(UploadProductResource, '/seller/products/upload')
+    api.add_resource(ProductUpdateResource, '/seller/products/<int:product_id>')
     api.add_resource(SellerProductListResource, '/seller/products')
     api.add_resource(SellerSingleProductResource, '/seller/products/<int:product_id>')
-    api.add_resource(ProductUpdateResource, '/seller/products/<int:product_id>')
     api.add_resource(ProductDeleteResource, '/seller/products/<int:product_id>')
 
     # Sellers Coupon Resources 
@@ -72,9 +80,11 @@ def register_routes(app):
     # **** Buyer Product Resources ****
     api.add_resource(ProductListResource, '/buyer/products')
     api.add_resource(ProductDetailResource, '/buyer/products/<int:product_id>')
+    api.add_resource(ProductClipResource, '/buyer/products/<int:product_id>/clip')
 
     # Buyer Download Resources
     api.add_resource(BuyerDownloadListResource, '/buyer/downloads')
+    api.add_resource(BuyerDownloadBundleResource, '/buyer/downloads/bundle')
     api.add_resource(BuyerDownloadFileResource, '/buyer/download/<int:order_item_id>')
 
     # Buyer Wishlist Resources
@@ -97,6 +107,7 @@ def register_routes(app):
 
     # Buyer Checkout Resources
     api.add_resource(ApplyCouponResource, '/buyer/apply-coupon')
+    api.add_resource(CheckoutQuoteResource, '/buyer/checkout/quote')
     api.add_resource(CheckoutResource, '/buyer/checkout')
     # api.add_resource(PaymentSuccessResource, '/payment/success')
 
@@ -110,6 +121,7 @@ def register_routes(app):
     api.add_resource(BuyerOrdersResource, '/buyer/order')
     api.add_resource(BuyerOrderDetailResource, '/buyer/order/<int:order_id>')
     api.add_resource(BuyerOrderInvoiceResource, '/buyer/order/<int:order_id>/invoice')
+    api.add_resource(BuyerInvoiceBatchResource, '/buyer/order/invoices')
     api.add_resource(BuyerCancelOrderResource, '/buyer/order/<int:order_id>/cancel') 
     api.add_resource(BuyerCancelPendingOrderResource, '/buyer/order/cancel-pending')
     api.add_resource(BuyerRetryCheckoutResource, '/buyer/order/<int:order_id>/retry')
@@ -130,4 +142,7 @@ def register_routes(app):
     api.add_resource(DeleteUserResource, '/admin/users/<int:target_user_id>/delete')
     api.add_resource(RecoverUserResource, '/admin/users/<int:target_user_id>/recover')
     api.add_resource(HardDeleteUserResource, '/admin/users/<int:target_user_id>/hard-delete')
-    api.add_resource(TrashCountResource, '/admin/users/trash-count')
\ No newline at end of file
+    api.add_resource(TrashCountResource, '/admin/users/trash-count')
+
+    # Admin Metrics Resource
+    api.add_resource(AdminMetricsResource, '/admin/metrics')
\ No newline at end of file
@@ -61,6 +61,7 @@ class Product(db.Model):
     genre = db.Column(db.String(100), nullable=True)  # e.g., Ambient, Rock, Cinematic
     duration = db.Column(db.String(20), nullable=True)  # e.g., "2:34"
     audio_format = db.Column(db.String(20), nullable=True)  # e.g., 'MP3', 'WAV','OGG'
+    original_format = db.Column(db.String(20), nullable=True)  # format uploaded; WAV masters are stored as FLAC
     bpm = db.Column(db.Integer, nullable=True)  # Beats per minute (for music use cases)
     license_type = db.Column(db.String(100), nullable=True)  # e.g., 'Royalty-Free', 'Creative Commons'
 
@@ -92,17 +93,33 @@ class Order(db.Model):
     stripe_payment_id = db.Column(db.String(100), nullable=True)  # Store Stripe payment intent ID
     status = db.Column(db.String(50), default='paid')  # 'paid', 'failed', etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    invoice_key = db.Column(db.String(100), nullable=True)  # storage key of the rendered invoice PDF
 
     items = db.relationship('OrderItem', backref='order', lazy=True)
 
+    __table_args__ = (
+        # Buyer order history pages newest-first by (created_at, id)
+        db.Index('ix_orders_buyer_created', 'buyer_id', 'created_at', 'id'),
+        # Stale pending orders for the expiry sweeper
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+    )
+
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # product's seller, copied at checkout
     quantity = db.Column(db.Integer, default=1)
     price = db.Column(db.Float, nullable=False)  # Final price after discount if any
+    download_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see claim_download()
+
+    # Seller dashboards, sales and order lists filter on seller_id without joining products
+    __table_args__ = (
+        db.Index('ix_order_items_seller_order', 'seller_id', 'order_id'),
+        db.Index('ix_order_items_seller_product', 'seller_id', 'product_id'),
+    )
 
 class Coupon(db.Model):
     __tablename__ = 'coupons'
@@ -124,9 +141,12 @@ class DownloadHistory(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     order_item_id = db.Column(db.Integer, db.ForeignKey('order_items.id'), nullable=False)
     download_time = db.Column(db.DateTime, default=datetime.utcnow)
+    resume_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see claim_resume()
 
     order_item = db.relationship('OrderItem', backref='downloads', lazy=True)
 
+    __table_args__ = (db.Index('ix_download_history_user_item', 'user_id', 'order_item_id'),)
+
 class Payout(db.Model):
     __tablename__ = 'payouts'
 
@@ -139,6 +159,37 @@ class Payout(db.Model):
     status = db.Column(db.String(50), default='pending')  # 'pending', 'paid'
     date = db.Column(db.DateTime, default=datetime.utcnow)
 
+class WebhookEvent(db.Model):
+    __tablename__ = 'webhook_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider_event_id = db.Column(db.String(255), unique=True, nullable=False)  # dedupes provider retries
+    event_type = db.Column(db.String(100), nullable=False)
+    object_id = db.Column(db.String(255), nullable=True, index=True)  # e.g. checkout session id; events per object run in order
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'processing', 'processed', 'dead'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_webhook_events_status_next_attempt', 'status', 'next_attempt_at'),)
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    aggregate_type = db.Column(db.String(50), nullable=False)  # 'order'
+    aggregate_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(100), nullable=False)  # e.g. 'order.paid'
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime, nullable=True)  # set once the relay has delivered it
+
+    __table_args__ = (db.Index('ix_outbox_events_published_id', 'published_at', 'id'),)
+
 class Review(db.Model):
     __tablename__ = 'reviews'
 
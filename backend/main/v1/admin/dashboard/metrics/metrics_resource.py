@@ -0,0 +1,30 @@
+from flask import current_app
+from flask_restful import Resource
+from main.common.jwt_utils import token_required
+from main.common.http_client import pool_stats
+from main.common.stripe.webhook_events import event_counts
+from main.common.outbox import outbox_backlog
+
+
+class AdminMetricsResource(Resource):
+    @token_required
+    def get(self, user_id, role):
+        if role != 'admin':
+            return {"code": 403, "status": 0, "message": "Admin access required"}, 403
+
+        # Per-worker counters; caches that haven't been used yet report None
+        data = {}
+        for name in ("download_cache", "clip_cache"):
+            cache = current_app.extensions.get(name)
+            data[name] = cache.stats() if cache else None
+        data["http_pools"] = pool_stats()
+        scheduler = current_app.extensions.get("download_scheduler")
+        data["download_scheduler"] = scheduler.stats() if scheduler else None
+        data["webhook_events"] = event_counts()  # shared across workers, from the database
+        data["outbox_backlog"] = outbox_backlog()
+
+        return {
+            "code": 200,
+            "status": 1,
+            "data": data
+        }, 200
@@ -2,7 +2,9 @@ from flask import request
 from flask_restful import Resource
 from main.database.models import db, CartItem, Product, Coupon
 from main.common.jwt_utils import token_required
+from main.common.pricing import load_cart_products
 from datetime import datetime
+from collections import defaultdict
 
 class AddToCartResource(Resource):
     @token_required
@@ -40,32 +42,28 @@ class ViewCartResource(Resource):
         if role != 'buyer':
             return {"code": 403, "message": "Only buyers can view cart", "status": 0}, 403
 
-        items = CartItem.query.filter_by(buyer_id=user_id).all()
-        result = []
-        for item in items:
-            product = Product.query.get(item.product_id)
-            if not product or product.is_deleted:
-                continue  
+        # Two queries whatever the cart size: cart products, then their valid coupons
+        products = [p for p in load_cart_products(user_id) if not p.is_deleted]
 
+        coupons_by_product = defaultdict(list)
+        if products:
             valid_coupons = Coupon.query.filter(
-                Coupon.product_id == product.id,
+                Coupon.product_id.in_([p.id for p in products]),
                 Coupon.valid_until >= datetime.utcnow()
             ).all()
-
-            coupons_data = [
-                {
+            for c in valid_coupons:
+                coupons_by_product[c.product_id].append({
                     "code": c.code,
                     "discount_percent": c.discount_percent,
                     "valid_until": c.valid_until.isoformat()
-                } for c in valid_coupons
-            ]
-
-            result.append({
-                "product_id": product.id,
-                "title": product.title,
-                "price": product.price,
-                "coupons": coupons_data
-            })
+                })
+
+        result = [{
+            "product_id": product.id,
+            "title": product.title,
+            "price": product.price,
+            "coupons": coupons_by_product[product.id]
+        } for product in products]
 
         return {
             "code": 200,
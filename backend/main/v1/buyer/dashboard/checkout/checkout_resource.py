@@ -1,15 +1,66 @@
-import os
-import stripe
-from flask import request
+from flask import request, current_app
 from flask_restful import Resource
-from datetime import datetime
-from collections import defaultdict
-from main.database.models import db, CartItem, Product, Order, OrderItem, Coupon, User
+from concurrent.futures import ThreadPoolExecutor, wait
+from main.database.models import db, CartItem, Product, Order, OrderItem
 from main.common.jwt_utils import token_required
-from dotenv import load_dotenv
-load_dotenv()
+from main.common.pricing import price_cart, sign_quote, load_quote, load_sellers, load_coupons, cart_product_ids, from_cents
+from main.common.payments import payment_client
+from main.common.outbox import record_order_event
+
+def session_params(quote, group, destination_account):
+    """Checkout session arguments for one seller's part of a quote."""
+    return {
+        "payment_method_types": ["card"],
+        "line_items": [{
+            "price_data": {
+                "currency": quote["currency"],
+                "product_data": {"name": item["title"]},
+                "unit_amount": item["price_cents"],
+            },
+            "quantity": 1,
+        } for item in group["items"]],
+        "mode": "payment",
+        "success_url": "http://192.168.1.34:5000/payment/success?session_id={CHECKOUT_SESSION_ID}",
+        "cancel_url": "http://192.168.1.34:5000/cart",
+        "payment_intent_data": {
+            "application_fee_amount": group["fee_cents"],
+            "transfer_data": {
+                "destination": destination_account
+            }
+        },
+    }
+
+
+def create_checkout_sessions(client, params_list, concurrency=4, timeout=15):
+    """Create one checkout session per params dict, at most `concurrency` at a time.
+
+    Returns (session, None) or (None, error message) per input, in order.
+    Calls still running after `timeout` seconds are reported as timed out;
+    a session they create later is never used and expires on the provider's
+    side. The worker threads make no database calls.
+    """
+    if not params_list:
+        return []
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(params_list))))
+    try:
+        futures = [executor.submit(client.create_checkout_session, **params) for params in params_list]
+        wait(futures, timeout=timeout)
+
+        results = []
+        for future in futures:
+            if not future.done():
+                future.cancel()
+                results.append((None, "Payment provider timed out"))
+            elif future.exception() is not None:
+                error = future.exception()
+                results.append((None, getattr(error, "user_message", None) or str(error) or type(error).__name__))
+            else:
+                results.append((future.result(), None))
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
 class ApplyCouponResource(Resource):
     @token_required
@@ -24,20 +75,24 @@ class ApplyCouponResource(Resource):
         if not product_id or not coupon_code:
             return {"code": 400, "message": "Product ID and coupon code are required", "status": 0}, 400
 
-        cart_item = CartItem.query.filter_by(buyer_id=user_id, product_id=product_id).first()
-        if not cart_item:
+        product = (
+            Product.query
+            .join(CartItem, CartItem.product_id == Product.id)
+            .filter(CartItem.buyer_id == user_id, Product.id == product_id)
+            .first()
+        )
+        if not product:
             return {
                 "code": 400,
                 "message": "Product must be in cart before applying a coupon",
                 "status": 0
             }, 400
 
-        product = Product.query.get(product_id)
-        if not product or product.is_deleted:
+        if product.is_deleted:
             return {"code": 404, "message": "Product not found or has been removed", "status": 0}, 404
 
-        coupon = Coupon.query.filter_by(code=coupon_code, product_id=product_id).first()
-        if not coupon or not coupon.is_valid():
+        coupon = load_coupons({product.id: coupon_code}).get(product.id)
+        if not coupon:
             return {"code": 404, "message": "Invalid or expired coupon", "status": 0}, 404
 
         return {
@@ -47,6 +102,24 @@ class ApplyCouponResource(Resource):
             "status": 1
         }, 200
 
+class CheckoutQuoteResource(Resource):
+    @token_required
+    def post(self, user_id, role):
+        if role != 'buyer':
+            return {"code": 403, "message": "Only buyers can checkout", "status": 0}, 403
+
+        data = request.get_json() or {}
+        quote = price_cart(user_id, data.get("coupons", {}))
+        if not quote["product_ids"]:
+            return {"code": 400, "message": "Cart is empty", "status": 0}, 400
+
+        return {
+            "code": 200,
+            "quote": quote,
+            "quote_token": sign_quote(quote),
+            "status": 1
+        }, 200
+
 class CheckoutResource(Resource):
     @token_required
     def post(self, user_id, role):
@@ -62,81 +135,53 @@ class CheckoutResource(Resource):
             }, 409
 
         data = request.get_json() or {}
-        coupons = data.get("coupons", {})
 
-        cart_items = CartItem.query.filter_by(buyer_id=user_id).all()
-        if not cart_items:
+        # A quote from /buyer/checkout/quote is honoured as priced while it is
+        # valid and the cart hasn't changed; without one the cart is priced now
+        quote_token = data.get("quote_token")
+        if quote_token:
+            quote = load_quote(quote_token, user_id)
+            if not quote:
+                return {"code": 400, "message": "Quote is invalid or has expired", "status": 0}, 400
+            if cart_product_ids(user_id) != quote["product_ids"]:
+                return {"code": 409, "message": "Cart has changed since the quote was issued", "status": 0}, 409
+        else:
+            quote = price_cart(user_id, data.get("coupons", {}))
+
+        if not quote["product_ids"]:
             return {"code": 400, "message": "Cart is empty", "status": 0}, 400
 
-        seller_cart = defaultdict(list)
-        for item in cart_items:
-            product = Product.query.get(item.product_id)
-            if not product or product.is_deleted:
-                continue
-            seller_cart[product.seller_id].append({
-                "item": item,
-                "product": product
-            })
-
-        if not seller_cart:
+        if not quote["sellers"]:
             return {"code": 400, "message": "No valid products found in cart", "status": 0}, 400
 
-        checkout_sessions = []
-
-        for seller_id, entries in seller_cart.items():
-            seller = User.query.get(seller_id)
+        sellers = load_sellers([group["seller_id"] for group in quote["sellers"]])
+        jobs = []
+        failures = []
+        for group in quote["sellers"]:
+            seller = sellers.get(group["seller_id"])
             if not seller or not seller.stripe_account_id:
+                failures.append({"seller_id": group["seller_id"], "error": "Seller cannot accept payments"})
                 continue
+            jobs.append((group, session_params(quote, group, seller.stripe_account_id)))
 
-            try:
-                line_items = []
-                order_total = 0
-                order_items = []
-
-                for entry in entries:
-                    product = entry["product"]
-                    item = entry["item"]
-                    price = product.price
-
-                    coupon_code = coupons.get(str(product.id))
-                    if coupon_code:
-                        coupon = Coupon.query.filter_by(code=coupon_code, product_id=product.id).first()
-                        if coupon and coupon.is_valid():
-                            price *= (1 - coupon.discount_percent / 100)
-
-                    price = round(price, 2)
-                    order_total += price
-                    order_items.append({"product_id": product.id, "price": price})
-
-                    line_items.append({
-                        "price_data": {
-                            "currency": "usd",
-                            "product_data": {"name": product.title},
-                            "unit_amount": int(price * 100),
-                        },
-                        "quantity": 1,
-                    })
-
-                if not line_items:
-                    continue
+        results = create_checkout_sessions(
+            payment_client(),
+            [params for _, params in jobs],
+            concurrency=current_app.config["CHECKOUT_SESSION_CONCURRENCY"],
+            timeout=current_app.config["CHECKOUT_SESSION_TIMEOUT"]
+        )
 
-                session = stripe.checkout.Session.create(
-                    payment_method_types=["card"],
-                    line_items=line_items,
-                    mode="payment",
-                    success_url="http://192.168.1.34:5000/payment/success?session_id={CHECKOUT_SESSION_ID}",
-                    cancel_url="http://192.168.1.34:5000/cart",
-                    payment_intent_data={
-                        "application_fee_amount": int(order_total * 0.1 * 100),
-                        "transfer_data": {
-                            "destination": seller.stripe_account_id
-                        }
-                    },
-                )
+        checkout_sessions = []
+        try:
+            # Every created session gets its order in one transaction
+            for (group, _), (session, error) in zip(jobs, results):
+                if error:
+                    failures.append({"seller_id": group["seller_id"], "error": error})
+                    continue
 
                 order = Order(
                     buyer_id=user_id,
-                    total_price=round(order_total, 2),
+                    total_price=from_cents(group["total_cents"]),
                     payment_method="stripe",
                     stripe_payment_id=session.id,
                     status="pending"
@@ -144,28 +189,32 @@ class CheckoutResource(Resource):
                 db.session.add(order)
                 db.session.flush()
 
-                for item in order_items:
+                for item in group["items"]:
                     db.session.add(OrderItem(
                         order_id=order.id,
                         product_id=item["product_id"],
-                        price=item["price"]
+                        seller_id=group["seller_id"],
+                        price=from_cents(item["price_cents"])
                     ))
+                record_order_event(order, "order.created", seller_id=group["seller_id"], item_count=len(group["items"]))
 
                 checkout_sessions.append({
-                    "seller_id": seller_id,
+                    "seller_id": group["seller_id"],
+                    "order_id": order.id,
                     "checkout_url": session.url
                 })
 
-            except Exception:
-                continue
-
-        db.session.commit()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {"code": 500, "message": f"Failed to create orders: {str(e)}", "status": 0}, 500
 
         if not checkout_sessions:
             return {
-                "code": 400,
-                "message": "No valid sellers with Stripe accounts found for checkout.",
+                "code": 502,
+                "message": "Checkout could not be started for any seller.",
+                "failed": failures,
                 "status": 0
-            }, 400
+            }, 502
 
-        return {"code": 200, "sessions": checkout_sessions, "status": 1}, 200
+        return {"code": 200, "sessions": checkout_sessions, "failed": failures, "status": 1}, 200
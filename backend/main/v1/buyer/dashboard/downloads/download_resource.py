@@ -1,14 +1,256 @@
 from flask_restful import Resource
-from flask import request, send_file
+from flask import request, Response, current_app, send_file, after_this_request
 from main.database.models import OrderItem, Order, Product, DownloadHistory
 from main.common.jwt_utils import token_required
+from main.common.signed_urls import sign_url
+from main.common.disk_cache import app_cache
+from main.common.download_scheduler import app_scheduler
+from main.common.storage import content_disposition, local_path, send_local_file
+from main.common.lossless import read_streaminfo, stream_wav, wav_size
+from main.common import http_client
+from main.common.zip_stream import stream_zip
 from main.extension import db
-from io import BytesIO
-import requests
+from sqlalchemy import func, update
+from urllib.parse import urlsplit
+from werkzeug.wsgi import ClosingIterator, FileWrapper
 import mimetypes
-from datetime import datetime
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
 MAX_DOWNLOADS_PER_PRODUCT = 3
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes held in memory per download at a time
+RESUME_WINDOW = timedelta(hours=24)  # how long a started download may be resumed for free
+MAX_RESUMES_PER_DOWNLOAD = 5  # free Range resumes per claimed download
+LIBRARY_CACHE_TTL = 30  # seconds; bounds how long product edits take to show
+LIBRARY_CACHE_MAX_USERS = 10000  # buyers cached per worker; the least recently used are dropped
+
+# user_id -> (expires_at, version, {(page, per_page): response}) for BuyerDownloadListResource,
+# least recently used first
+_library_cache = OrderedDict()
+_library_cache_lock = threading.Lock()
+
+# Upstream headers passed through to the buyer so Range/If-Range resumes work
+PASSTHROUGH_HEADERS = ("Content-Length", "Content-Range", "ETag", "Last-Modified")
+
+
+def stream_upstream(response):
+    # Yield upstream bytes as they arrive; only one chunk is buffered at a time
+    try:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if chunk:
+                yield chunk
+    finally:
+        response.close()
+
+
+def get_download_cache():
+    """Hot-file cache for proxied downloads, or None when DOWNLOAD_CACHE_MAX_BYTES is 0."""
+    if not current_app.config["DOWNLOAD_CACHE_MAX_BYTES"]:
+        return None
+    return app_cache(
+        "download_cache",
+        current_app.config["DOWNLOAD_CACHE_DIR"],
+        current_app.config["DOWNLOAD_CACHE_MAX_BYTES"]
+    )
+
+
+def fetch_to_file(url, path):
+    with http_client.get(url, stream=True, headers={"Accept-Encoding": "identity"}) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                f.write(chunk)
+
+
+def invalidate_download_library(user_id):
+    with _library_cache_lock:
+        _library_cache.pop(user_id, None)
+
+
+def library_version(user_id):
+    """A cheap stamp that changes whenever the buyer's library does, in any worker.
+
+    Paying or cancelling an order changes the paid count and every claimed
+    download adds a DownloadHistory row, so a cached library is only served
+    while both are unchanged.
+    """
+    paid_orders = (
+        db.session.query(func.count(Order.id))
+        .filter(Order.buyer_id == user_id, Order.status == "paid")
+        .scalar_subquery()
+    )
+    last_download = (
+        db.session.query(func.max(DownloadHistory.id))
+        .filter(DownloadHistory.user_id == user_id)
+        .scalar_subquery()
+    )
+    return tuple(db.session.query(paid_orders, last_download).one())
+
+
+def cached_library(user_id, cache_key, version):
+    with _library_cache_lock:
+        entry = _library_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic() or entry[1] != version:
+            del _library_cache[user_id]
+            return None
+        _library_cache.move_to_end(user_id)
+        return entry[2].get(cache_key)
+
+
+def cache_library(user_id, cache_key, version, result):
+    with _library_cache_lock:
+        entry = _library_cache.get(user_id)
+        if entry is None or entry[0] <= time.monotonic() or entry[1] != version:
+            entry = _library_cache[user_id] = (time.monotonic() + LIBRARY_CACHE_TTL, version, {})
+        entry[2][cache_key] = result
+        _library_cache.move_to_end(user_id)
+        while len(_library_cache) > LIBRARY_CACHE_MAX_USERS:
+            _library_cache.popitem(last=False)
+
+
+def claim_download(user_id, product_id, order_item_id, commit=True):
+    """Take one of the item's downloads; False if the limit is already reached.
+
+    The conditional UPDATE on order_items.download_count is the limit check,
+    so concurrent requests can't overshoot it. DownloadHistory stays an
+    append-only audit log written in the same transaction.
+    """
+    claimed = db.session.execute(
+        update(OrderItem)
+        .where(OrderItem.id == order_item_id, OrderItem.download_count < MAX_DOWNLOADS_PER_PRODUCT)
+        .values(download_count=OrderItem.download_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+    if not claimed:
+        return False
+
+    db.session.add(DownloadHistory(
+        user_id=user_id,
+        product_id=product_id,
+        order_item_id=order_item_id,
+        download_time=datetime.utcnow()
+    ))
+    if commit:
+        db.session.commit()
+        invalidate_download_library(user_id)
+    return True
+
+
+def claim_resume(user_id, order_item_id):
+    """Count a Range resume against the download it continues; False if there is none to continue.
+
+    Only the item's latest download can be resumed, within RESUME_WINDOW and
+    at most MAX_RESUMES_PER_DOWNLOAD times, so Range requests can't fetch the
+    file without limit. Like claim_download(), the conditional UPDATE is the check.
+    """
+    last_id = (
+        db.session.query(func.max(DownloadHistory.id))
+        .filter(DownloadHistory.user_id == user_id, DownloadHistory.order_item_id == order_item_id)
+        .scalar()
+    )
+    if last_id is None:
+        return False
+
+    claimed = db.session.execute(
+        update(DownloadHistory)
+        .where(
+            DownloadHistory.id == last_id,
+            DownloadHistory.download_time > datetime.utcnow() - RESUME_WINDOW,
+            DownloadHistory.resume_count < MAX_RESUMES_PER_DOWNLOAD
+        )
+        .values(resume_count=DownloadHistory.resume_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def claim_transfer(user_id, product_id, order_item_id, resume):
+    """Take a download, or a resume of the latest one; returns a response to send instead, or None."""
+    if resume:
+        return None if claim_resume(user_id, order_item_id) else resume_denied_response()
+    return None if claim_download(user_id, product_id, order_item_id) else download_limit_response()
+
+
+def resume_denied_response():
+    return {"code": 403, "message": "No recent download to resume", "status": 0}, 403
+
+
+def download_limit_response():
+    return {
+        "code": 403,
+        "message": f"Download limit reached. Max allowed is {MAX_DOWNLOADS_PER_PRODUCT}",
+        "status": 0
+    }, 403
+
+
+def admit_download(user_id):
+    """Take a download stream slot for this request, or return a 429 to send instead.
+
+    The slot is held until the response body has been sent or the client
+    goes away. With a bandwidth budget a successful body is paced to the
+    stream's share; without one it is left alone so sendfile still applies.
+    """
+    scheduler = app_scheduler()
+    slot = scheduler.acquire(user_id)
+    if slot is None:
+        retry_after = current_app.config["DOWNLOAD_RETRY_AFTER"]
+        return {
+            "code": 429,
+            "message": "Too many downloads in progress, please retry shortly",
+            "status": 0
+        }, 429, {"Retry-After": str(retry_after)}
+
+    @after_this_request
+    def hold_slot(response):
+        if scheduler.bandwidth and response.status_code in (200, 206):
+            body = response.response
+            # pace() releases in its finally, which never runs if the server closes the
+            # body unread (HEAD, early disconnect); the wrapper closes body and releases then
+            callbacks = [body.close] if hasattr(body, "close") else []
+            response.response = ClosingIterator(scheduler.pace(body, slot), callbacks + [slot.release])
+        else:
+            release_on_close(response, slot.release)
+        return response
+
+    return None
+
+
+def release_on_close(response, release):
+    """Call release when the server closes response's body.
+
+    call_on_close() isn't enough: direct_passthrough bodies (send_file,
+    streamed proxies) go to the server as they are and its callbacks never
+    run. A WSGI file wrapper keeps its type, so gunicorn still uses sendfile,
+    and gets release chained onto its close(); other bodies are wrapped.
+    """
+    body = response.response
+    file_wrapper = request.environ.get("wsgi.file_wrapper", FileWrapper)
+    if isinstance(file_wrapper, type) and isinstance(body, file_wrapper):
+        close = getattr(body, "close", None)
+
+        def close_and_release():
+            try:
+                if close is not None:
+                    close()
+            finally:
+                release()
+
+        body.close = close_and_release
+    else:
+        response.response = ClosingIterator(body, release)
+
+
+def is_resume_request(range_header):
+    """A Range that doesn't start at byte 0 continues an earlier download."""
+    if not range_header:
+        return False
+    return not range_header.replace(" ", "").startswith("bytes=0-")
 
 class BuyerDownloadListResource(Resource):
     @token_required
@@ -16,42 +258,75 @@ class BuyerDownloadListResource(Resource):
         if role != "buyer":
             return {"code": 403, "message": "Unauthorized access", "status": 0}, 403
 
-        # Get all paid order items for this buyer
-        order_items = OrderItem.query.join(Order).filter(
-            Order.buyer_id == user_id,
-            Order.status == "paid"
-        ).all()
-
-        downloads = []
-        for item in order_items:
-            product = Product.query.get(item.product_id)
-            if not product:
-                continue
-
-            download_entries = DownloadHistory.query.filter_by(
-                user_id=user_id,
-                order_item_id=item.id
-            ).order_by(DownloadHistory.download_time.desc()).all()
-
-            download_count = len(download_entries)
-            last_download_time = download_entries[0].download_time.isoformat() if download_entries else None
-
-            downloads.append({
-                "order_item_id": item.id,
-                "product_id": product.id,
-                "title": product.title,
-                "downloaded": download_count,
-                "remaining_downloads": max(0, MAX_DOWNLOADS_PER_PRODUCT - download_count),
-                "last_download_time": last_download_time
-                # Notice: file_url is intentionally not included for security
-            })
+        # Pagination is opt-in so existing clients still get the full library
+        page = request.args.get("page", type=int)
+        per_page = max(1, min(request.args.get("per_page", 20, type=int), 100))
 
-        return {
+        cache_key = (page, per_page)
+        version = library_version(user_id)
+        cached = cached_library(user_id, cache_key, version)
+        if cached is not None:
+            return cached, 200
+
+        # Last download time per item, aggregated in SQL (counts live on the item)
+        download_stats = (
+            db.session.query(
+                DownloadHistory.order_item_id.label("order_item_id"),
+                func.max(DownloadHistory.download_time).label("last_download_time")
+            )
+            .filter(DownloadHistory.user_id == user_id)
+            .group_by(DownloadHistory.order_item_id)
+            .subquery()
+        )
+
+        # Get all paid order items for this buyer, with their product and stats
+        query = (
+            db.session.query(
+                OrderItem.id.label("order_item_id"),
+                Product.id.label("product_id"),
+                Product.title,
+                OrderItem.download_count.label("downloaded"),
+                download_stats.c.last_download_time
+            )
+            .join(Order, Order.id == OrderItem.order_id)
+            .join(Product, Product.id == OrderItem.product_id)
+            .outerjoin(download_stats, download_stats.c.order_item_id == OrderItem.id)
+            .filter(Order.buyer_id == user_id, Order.status == "paid")
+            .order_by(OrderItem.id)
+        )
+
+        if page:
+            paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+            rows = paginated.items
+        else:
+            rows = query.all()
+
+        downloads = [{
+            "order_item_id": row.order_item_id,
+            "product_id": row.product_id,
+            "title": row.title,
+            "downloaded": int(row.downloaded),
+            "remaining_downloads": max(0, MAX_DOWNLOADS_PER_PRODUCT - int(row.downloaded)),
+            "last_download_time": row.last_download_time.isoformat() if row.last_download_time else None
+            # Notice: file_url is intentionally not included for security
+        } for row in rows]
+
+        result = {
             "code": 200,
             "message": "Downloadable products fetched",
             "status": 1,
             "downloads": downloads
-        }, 200
+        }
+        if page:
+            result["pagination"] = {
+                "page": paginated.page,
+                "per_page": paginated.per_page,
+                "total_pages": paginated.pages,
+                "total_items": paginated.total
+            }
+
+        cache_library(user_id, cache_key, version, result)
+        return result, 200
 
 
 class BuyerDownloadFileResource(Resource):
@@ -74,55 +349,281 @@ class BuyerDownloadFileResource(Resource):
         if not product or not product.file_url:
             return {"code": 404, "message": "File not found", "status": 0}, 404
 
-        # Check download limit
-        download_count = DownloadHistory.query.filter_by(
-            user_id=user_id, order_item_id=order_item_id
-        ).count()
+        # 'proxy' streams through this worker; 'signed' and 'accel' only authorize
+        # and hand the transfer to the edge/CDN or to nginx. Only the operator
+        # picks: a mode the deployment doesn't serve would hand out a bad download
+        delivery = current_app.config["DOWNLOAD_DELIVERY"]
+        if delivery not in ("proxy", "signed", "accel"):
+            return {"code": 503, "message": "Download delivery is misconfigured", "status": 0}, 503
+        if delivery == "signed" and not current_app.config["DOWNLOAD_SIGNING_KEY"]:
+            return {"code": 503, "message": "Signed downloads are not configured", "status": 0}, 503
+        if delivery == "signed" and not current_app.config["DOWNLOAD_URL_BASE"] and not local_path(product.file_url):
+            # Without an edge that checks the signature, a remote file's signed URL is its permanent raw URL
+            return {"code": 503, "message": "Signed downloads are not configured", "status": 0}, 503
 
-        if download_count >= MAX_DOWNLOADS_PER_PRODUCT:
-            return {
-                "code": 403,
-                "message": f"Download limit reached. Max allowed is {MAX_DOWNLOADS_PER_PRODUCT}",
-                "status": 0
-            }, 403
+        range_header = request.headers.get("Range")
+        resume = delivery == "proxy" and is_resume_request(range_header)
 
-        try:
-            # Download from Cloudinary
-            response = requests.get(product.file_url, stream=True, timeout=10)
-            if response.status_code != 200:
-                return {"code": 500, "message": "Failed to retrieve file", "status": 0}, 500
+        if resume:
+            # Resuming doesn't consume a download, but only a few times, shortly after one was
+            # started; cheap early exit, claim_resume() is what enforces it
+            last_download = DownloadHistory.query.filter_by(
+                user_id=user_id, order_item_id=order_item_id
+            ).order_by(DownloadHistory.id.desc()).first()
+
+            if (not last_download or datetime.utcnow() - last_download.download_time > RESUME_WINDOW
+                    or last_download.resume_count >= MAX_RESUMES_PER_DOWNLOAD):
+                return resume_denied_response()
+        elif item.download_count >= MAX_DOWNLOADS_PER_PRODUCT:
+            # Cheap early exit; claim_download() is what actually enforces the limit
+            return download_limit_response()
 
-            file_ext = product.file_url.split("?")[0].split(".")[-1].lower()
-            if file_ext not in ["mp3", "wav", "ogg"]:
-                return {"code": 400, "message": "Unsupported file format", "status": 0}, 400
+        file_ext = product.file_url.split("?")[0].split(".")[-1].lower()
+        if file_ext not in ["mp3", "wav", "ogg", "flac"]:
+            return {"code": 400, "message": "Unsupported file format", "status": 0}, 400
 
-            mime_type = mimetypes.types_map.get(f".{file_ext}", "application/octet-stream")
-            filename = f"{product.title}.{file_ext}"
+        # WAV masters are stored as FLAC: proxied downloads rebuild the WAV unless
+        # ?format=flac asks for the smaller file; signed/accel always hand out the FLAC
+        wav_from_flac = False
+        if file_ext == "flac" and product.original_format == "wav":
+            requested_format = request.args.get("format", "wav")
+            if requested_format not in ("wav", "flac"):
+                return {"code": 400, "message": "format must be wav or flac", "status": 0}, 400
+            wav_from_flac = delivery == "proxy" and requested_format == "wav"
 
-            # Log the download
-            download = DownloadHistory(
-                user_id=user_id,
-                product_id=product.id,
-                order_item_id=order_item_id,
-                download_time=datetime.utcnow()
+        delivered_ext = "wav" if wav_from_flac else file_ext
+        mime_type = mimetypes.guess_type(f"x.{delivered_ext}")[0] or "application/octet-stream"
+        filename = f"{product.title}.{delivered_ext}"
+
+        if delivery == "signed":
+            try:
+                if not claim_download(user_id, product.id, order_item_id):
+                    return download_limit_response()
+            except Exception as e:
+                db.session.rollback()
+                return {"code": 500, "message": f"Error recording download: {str(e)}", "status": 0}, 500
+
+            download_url, expires_at = sign_url(
+                product.file_url,
+                current_app.config["DOWNLOAD_SIGNING_KEY"],
+                current_app.config["DOWNLOAD_URL_TTL"],
+                base_url=current_app.config["DOWNLOAD_URL_BASE"]
             )
-            db.session.add(download)
-            db.session.commit()
+            return {
+                "code": 200,
+                "message": "Download URL issued",
+                "status": 1,
+                "download_url": download_url,
+                "filename": filename,
+                "expires_at": datetime.utcfromtimestamp(expires_at).isoformat()
+            }, 200
+
+        if delivery == "accel":
+            try:
+                if not claim_download(user_id, product.id, order_item_id):
+                    return download_limit_response()
+            except Exception as e:
+                db.session.rollback()
+                return {"code": 500, "message": f"Error recording download: {str(e)}", "status": 0}, 500
+
+            # nginx serves the body (incl. Range) from its internal location
+            file_response = Response(status=200, mimetype=mime_type)
+            file_response.headers["X-Accel-Redirect"] = current_app.config["DOWNLOAD_ACCEL_PREFIX"] + urlsplit(product.file_url).path
+            file_response.headers["Content-Disposition"] = content_disposition(filename)
+            return file_response
+
+        busy = admit_download(user_id)
+        if busy:
+            return busy
+
+        if wav_from_flac:
+            source = local_path(product.file_url) or product.file_url
+            try:
+                info = read_streaminfo(source)
+                denied = claim_transfer(user_id, product.id, order_item_id, resume)
+                if denied:
+                    return denied
+            except Exception as e:
+                db.session.rollback()
+                return {"code": 500, "message": f"Error downloading file: {str(e)}", "status": 0}, 500
+
+            # Decoded as it is sent; the whole file is always sent, so Range is ignored
+            file_response = Response(stream_wav(source, info), status=200, mimetype=mime_type, direct_passthrough=True)
+            size = wav_size(info)
+            if size is not None:
+                file_response.headers["Content-Length"] = str(size)
+            file_response.headers["Content-Disposition"] = content_disposition(filename)
+            return file_response
+
+        path = local_path(product.file_url)
+        if path:
+            # Local storage backend: no upstream fetch, the server sends the file itself
+            try:
+                denied = claim_transfer(user_id, product.id, order_item_id, resume)
+                if denied:
+                    return denied
+            except Exception as e:
+                db.session.rollback()
+                return {"code": 500, "message": f"Error recording download: {str(e)}", "status": 0}, 500
+            return send_local_file(path, download_name=filename, mimetype=mime_type)
+
+        cache = get_download_cache()
+        if cache is not None:
+            # Storage URLs are versioned, so the URL identifies the file's content
+            def fill(tmp_path):
+                fetch_to_file(product.file_url, tmp_path)
+
+            def send(path):
+                # send_file handles Range/If-Range and uses sendfile where the server supports it
+                return send_file(
+                    path,
+                    as_attachment=True,
+                    download_name=filename,
+                    mimetype=mime_type,
+                    conditional=True
+                )
+
+            try:
+                path = cache.get_or_create(product.file_url, fill)
+                denied = claim_transfer(user_id, product.id, order_item_id, resume)
+                if denied:
+                    return denied
+                try:
+                    return send(path)
+                except FileNotFoundError:
+                    # Another worker evicted it after the lookup; fetch it again (already claimed)
+                    return send(cache.get_or_create(product.file_url, fill))
+            except Exception as e:
+                db.session.rollback()
+                return {"code": 500, "message": f"Error downloading file: {str(e)}", "status": 0}, 500
+
+        upstream_headers = {"Accept-Encoding": "identity"}  # keep Content-Length/Range byte-exact
+        if range_header:
+            upstream_headers["Range"] = range_header
+            if request.headers.get("If-Range"):
+                upstream_headers["If-Range"] = request.headers["If-Range"]
+
+        response = None
+        try:
+            # Stream from Cloudinary
+            response = http_client.get(product.file_url, stream=True, headers=upstream_headers)
+            if response.status_code == 416:
+                response.close()
+                return {"code": 416, "message": "Requested range not satisfiable", "status": 0}, 416
+            if response.status_code not in (200, 206):
+                response.close()
+                return {"code": 500, "message": "Failed to retrieve file", "status": 0}, 500
+
+            denied = claim_transfer(user_id, product.id, order_item_id, resume)
+            if denied:
+                response.close()
+                return denied
 
-            # Stream file to user
-            file_like = BytesIO(response.content)
-            file_like.seek(0)
-            return send_file(
-                file_like,
-                as_attachment=True,
-                download_name=filename,
-                mimetype=mime_type
+            # Pipe upstream bytes to the buyer as they arrive
+            file_response = Response(
+                stream_upstream(response),
+                status=response.status_code,
+                mimetype=mime_type,
+                direct_passthrough=True
             )
+            for header in PASSTHROUGH_HEADERS:
+                if header in response.headers:
+                    file_response.headers[header] = response.headers[header]
+            file_response.headers["Accept-Ranges"] = "bytes"
+            file_response.headers["Content-Disposition"] = content_disposition(filename)
+            return file_response
 
         except Exception as e:
+            if response is not None:
+                response.close()
             db.session.rollback()
             return {
                 "code": 500,
                 "message": f"Error downloading file: {str(e)}",
                 "status": 0
             }, 500
+
+
+class BuyerDownloadBundleResource(Resource):
+    @token_required
+    def get(self, user_id, role):
+        if role != "buyer":
+            return {"code": 403, "message": "Unauthorized access", "status": 0}, 403
+
+        raw_ids = request.args.get("order_item_ids")
+        try:
+            requested_ids = {int(i) for i in raw_ids.split(",") if i.strip()} if raw_ids else None
+        except ValueError:
+            return {"code": 400, "message": "order_item_ids must be a comma-separated list of ids", "status": 0}, 400
+
+        query = (
+            db.session.query(OrderItem.id, Product.id, Product.title, Product.file_url, OrderItem.download_count)
+            .join(Order, Order.id == OrderItem.order_id)
+            .join(Product, Product.id == OrderItem.product_id)
+            .filter(Order.buyer_id == user_id, Order.status == "paid")
+            .order_by(OrderItem.id)
+        )
+        if requested_ids is not None:
+            query = query.filter(OrderItem.id.in_(requested_ids))
+        rows = query.all()
+
+        if requested_ids is not None and len(rows) != len(requested_ids):
+            return {"code": 403, "message": "You have not purchased all of these items", "status": 0}, 403
+
+        # Explicitly requested items must all be downloadable; "everything" skips exhausted ones
+        exhausted = [row[0] for row in rows if row[4] >= MAX_DOWNLOADS_PER_PRODUCT]
+        if requested_ids is not None and exhausted:
+            return {
+                "code": 403,
+                "message": f"Download limit reached for order items {exhausted}. Max allowed is {MAX_DOWNLOADS_PER_PRODUCT}",
+                "status": 0
+            }, 403
+        rows = [row for row in rows if row[4] < MAX_DOWNLOADS_PER_PRODUCT and row[3]]
+        if not rows:
+            return {"code": 404, "message": "No downloadable items", "status": 0}, 404
+
+        # Admit before claiming, so a 429 doesn't use up a download of every item
+        busy = admit_download(user_id)
+        if busy:
+            return busy
+
+        try:
+            # Claim one download per item in a single transaction, logged before streaming
+            # like single downloads; a lost race on an explicit item fails the whole bundle
+            claimed_rows = []
+            for row in rows:
+                if claim_download(user_id, row[1], row[0], commit=False):
+                    claimed_rows.append(row)
+                elif requested_ids is not None:
+                    db.session.rollback()
+                    return download_limit_response()
+            db.session.commit()
+            invalidate_download_library(user_id)
+        except Exception as e:
+            db.session.rollback()
+            return {"code": 500, "message": f"Error recording downloads: {str(e)}", "status": 0}, 500
+
+        rows = claimed_rows
+        if not rows:
+            return {"code": 404, "message": "No downloadable items", "status": 0}, 404
+
+        entries = []
+        used_names = set()
+        for order_item_id, product_id, title, file_url, _ in rows:
+            file_ext = file_url.split("?")[0].split(".")[-1].lower()
+            base = title.replace("/", "_").replace("\\", "_")
+            name = f"{base}.{file_ext}"
+            n = 2
+            while name in used_names:
+                name = f"{base} ({n}).{file_ext}"
+                n += 1
+            used_names.add(name)
+            entries.append((name, local_path(file_url) or file_url))
+
+        response = Response(
+            stream_zip(entries, concurrency=current_app.config["BUNDLE_FETCH_CONCURRENCY"]),
+            mimetype="application/zip",
+            direct_passthrough=True
+        )
+        response.headers["Content-Disposition"] = content_disposition(f"purchases_{datetime.utcnow():%Y%m%d}.zip")
+        return response
@@ -1,19 +1,89 @@
-from flask import request, jsonify, send_file
+import os
+import json
+import base64
+from flask import request, current_app, Response
 from flask_restful import Resource
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update
 from main.database.models import db, Order, OrderItem, Product, User, CartItem
 from main.common.jwt_utils import token_required
-from dotenv import load_dotenv
-load_dotenv()
-import stripe
-import os
+from main.common.payments import payment_client
+from main.common.invoices import invoice_paths, request_invoices
+from main.common.outbox import record_order_event
+from main.common.storage import send_local_file, content_disposition
+from main.common.zip_stream import stream_zip
+
+MAX_ORDERS_PER_PAGE = 100
+INVOICE_MAX_AGE = 365 * 24 * 3600
+
+
+def invoices_pending_response(orders):
+    """202 asking the client to retry while the worker renders these invoices."""
+    try:
+        request_invoices(orders)
+    except Exception as e:
+        db.session.rollback()
+        return {"code": 500, "message": f"Failed to request invoices: {str(e)}", "status": 0}, 500
+    return {
+        "code": 202,
+        "message": "Invoice is being generated, try again shortly",
+        "status": 0
+    }, 202, {"Retry-After": str(current_app.config["INVOICE_RETRY_AFTER"])}
+
+
+def encode_cursor(order):
+    raw = json.dumps([order.created_at.isoformat(), order.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) of the last order on the previous page; ValueError if malformed."""
+    try:
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_date(value, field):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{field} must be a date in YYYY-MM-DD format")
+
+
+def load_order_items(order_ids):
+    """Items with their product titles for many orders in one query, keyed by order id."""
+    items = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items
+    rows = (
+        db.session.query(OrderItem.order_id, OrderItem.product_id, Product.title, OrderItem.price, OrderItem.quantity)
+        .join(Product, Product.id == OrderItem.product_id)
+        .filter(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.id)
+        .all()
+    )
+    for row in rows:
+        items[row.order_id].append({
+            "product_id": row.product_id,
+            "product_title": row.title,
+            "price": row.price,
+            "quantity": row.quantity
+        })
+    return items
+
+
+def serialize_order(order, items):
+    return {
+        "order_id": order.id,
+        "total_price": order.total_price,
+        "status": order.status,
+        "payment_method": order.payment_method,
+        "created_at": order.created_at.isoformat(),
+        "items": items
+    }
 
-stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
 class BuyerOrdersResource(Resource):
     @token_required
@@ -21,26 +91,53 @@ class BuyerOrdersResource(Resource):
         if role != "buyer":
             return {"code": 403, "message": "Access denied", "status": 0}, 403
 
-        orders = Order.query.filter_by(buyer_id=user_id).order_by(Order.created_at.desc()).all()
-        data = []
-        for order in orders:
-            data.append({
-                "order_id": order.id,
-                "total_price": order.total_price,
-                "status": order.status,
-                "payment_method": order.payment_method,
-                "created_at": order.created_at.isoformat(),
-                "items": [
-                    {
-                        "product_id": item.product_id,
-                        "product_title": item.product.title,
-                        "price": item.price,
-                        "quantity": item.quantity
-                    } for item in order.items
-                ]
-            })
+        # Newest first. Pagination is opt-in (?limit= or ?cursor=) so existing clients still get every order;
+        # pages are keyset-based on (created_at, id), so a page costs the same however deep it is.
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit", type=int)
+        paginate = bool(cursor or limit)
+        limit = max(1, min(limit or 20, MAX_ORDERS_PER_PAGE))
 
-        return {"code": 200, "data": data, "status": 1}, 200
+        query = Order.query.filter(Order.buyer_id == user_id)
+
+        statuses = [s for s in request.args.get("status", "").split(",") if s]
+        if statuses:
+            query = query.filter(Order.status.in_(statuses))
+
+        try:
+            if request.args.get("from"):
+                query = query.filter(Order.created_at >= parse_date(request.args["from"], "from"))
+            if request.args.get("to"):
+                # Inclusive of the whole "to" day
+                query = query.filter(Order.created_at < parse_date(request.args["to"], "to") + timedelta(days=1))
+            if cursor:
+                created_at, order_id = decode_cursor(cursor)
+                query = query.filter(or_(
+                    Order.created_at < created_at,
+                    and_(Order.created_at == created_at, Order.id < order_id)
+                ))
+        except ValueError as e:
+            return {"code": 400, "message": str(e), "status": 0}, 400
+
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        if paginate:
+            orders = query.limit(limit + 1).all()
+            has_more = len(orders) > limit
+            orders = orders[:limit]
+        else:
+            orders = query.all()
+
+        items = load_order_items([order.id for order in orders])
+        data = [serialize_order(order, items[order.id]) for order in orders]
+
+        result = {"code": 200, "data": data, "status": 1}
+        if paginate:
+            result["pagination"] = {
+                "limit": limit,
+                "next_cursor": encode_cursor(orders[-1]) if has_more else None,
+                "has_more": has_more
+            }
+        return result, 200
 
 
 class BuyerOrderDetailResource(Resource):
@@ -53,21 +150,7 @@ class BuyerOrderDetailResource(Resource):
         if not order:
             return {"code": 404, "message": "Order not found", "status": 0}, 404
 
-        data = {
-            "order_id": order.id,
-            "total_price": order.total_price,
-            "status": order.status,
-            "payment_method": order.payment_method,
-            "created_at": order.created_at.isoformat(),
-            "items": [
-                {
-                    "product_id": item.product_id,
-                    "product_title": item.product.title,
-                    "price": item.price,
-                    "quantity": item.quantity
-                } for item in order.items
-            ]
-        }
+        data = serialize_order(order, load_order_items([order.id])[order.id])
 
         return {"code": 200, "data": data, "status": 1}, 200
 
@@ -81,123 +164,63 @@ class BuyerOrderInvoiceResource(Resource):
         if not order:
             return {"code": 404, "message": "Order not found", "status": 0}, 404
 
-        buyer = User.query.get(order.buyer_id)
-
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        margin = 50
-        y = height - margin
-        line_height = 18
-
-        def draw_header():
-            nonlocal y
-            # Colored header
-            p.setFillColor(colors.HexColor("#6B46C1"))  # Purple
-            p.rect(0, height - 60, width, 60, fill=1, stroke=0)
-            p.setFillColor(colors.white)
-            p.setFont("Helvetica-Bold", 20)
-            p.drawString(margin, height - 40, "INVOICE")
-            p.setFillColor(colors.black)
-            y -= 80
-
-        def draw_footer():
-            p.setFont("Helvetica-Oblique", 10)
-            p.setFillColor(colors.HexColor("#4A5568"))  # Gray
-            p.drawCentredString(width / 2, 40, "Thank you for shopping with us!")
-            p.setFillColor(colors.black)
-
-        def new_page():
-            nonlocal y
-            p.showPage()
-            draw_header()
-            y = height - margin
-
-        draw_header()
-
-        # Invoice Metadata
-        p.setFont("Helvetica", 12)
-        p.drawString(margin, y, f"Invoice #: {order.id}")
-        y -= line_height
-        p.drawString(margin, y, f"Date: {order.created_at.strftime('%Y-%m-%d %H:%M:%S')}")
-        y -= line_height
-        p.drawString(margin, y, f"Buyer: {buyer.name} (ID: {buyer.id})")
-        y -= line_height
-        p.drawString(margin, y, f"Email: {buyer.email}")
-        y -= line_height * 2
-
-        # Table Header
-        p.setFont("Helvetica-Bold", 12)
-        p.setFillColor(colors.HexColor("#EDF2F7"))  # Light gray background
-        p.rect(margin - 5, y - 5, width - 2 * margin + 10, line_height + 4, fill=1, stroke=0)
-        p.setFillColor(colors.black)
-        p.drawString(margin, y, "Item")
-        p.drawString(margin + 200, y, "Price")
-        p.drawString(margin + 300, y, "Qty")
-        p.drawString(margin + 370, y, "Total")
-        y -= line_height + 6
-
-        p.setFont("Helvetica", 12)
-
-        seller_info_set = set()
-
-        for item in order.items:
-            if y < 100:
-                new_page()
-
-            product = item.product
-            total = item.price * item.quantity
-            seller = product.seller
-
-            # Draw product line
-            p.drawString(margin, y, product.title)
-            p.drawString(margin + 200, y, f"${item.price:.2f}")
-            p.drawString(margin + 300, y, str(item.quantity))
-            p.drawString(margin + 370, y, f"${total:.2f}")
-            y -= line_height
-
-            # Collect seller info
-            seller_info_set.add((seller.name, seller.email, seller.store_name or "N/A"))
-
-        # Total Summary
-        if y < 120:
-            new_page()
-
-        y -= line_height
-        p.line(margin, y + 6, width - margin, y + 6)
-        y -= line_height
-
-        p.setFont("Helvetica-Bold", 12)
-        p.drawRightString(width - margin - 10, y, f"Total: ${order.total_price:.2f}")
-        y -= line_height * 2
-
-        # Seller Information Section (after table)
-        p.setFont("Helvetica-Bold", 13)
-        p.drawString(margin, y, "Seller Information")
-        y -= line_height
-
-        p.setFont("Helvetica", 11)
-        for name, email, store in seller_info_set:
-            if y < 80:
-                new_page()
-            p.drawString(margin, y, f"Name: {name}")
-            y -= line_height
-            p.drawString(margin, y, f"Email: {email}")
-            y -= line_height
-            p.drawString(margin, y, f"Store: {store}")
-            y -= line_height * 2
-
-        draw_footer()
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
-            as_attachment=True,
+        paths, missing = invoice_paths([order])
+        if missing:
+            return invoices_pending_response(missing)
+        key, path = paths[order.id]
+
+        # The key is a hash of the bytes, so it is a strong validator and the file never changes
+        response = send_local_file(
+            path,
             download_name=f"invoice_order_{order.id}.pdf",
-            mimetype="application/pdf"
+            mimetype="application/pdf",
+            max_age=INVOICE_MAX_AGE,
+            etag=os.path.basename(key).split(".")[0]
         )
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+
+
+class BuyerInvoiceBatchResource(Resource):
+    @token_required
+    def get(self, user_id, role):
+        if role != "buyer":
+            return {"code": 403, "message": "Access denied", "status": 0}, 403
+
+        query = Order.query.filter(Order.buyer_id == user_id, Order.status == "paid")
+        try:
+            if request.args.get("from"):
+                query = query.filter(Order.created_at >= parse_date(request.args["from"], "from"))
+            if request.args.get("to"):
+                query = query.filter(Order.created_at < parse_date(request.args["to"], "to") + timedelta(days=1))
+        except ValueError as e:
+            return {"code": 400, "message": str(e), "status": 0}, 400
+
+        limit = current_app.config["INVOICE_BATCH_MAX"]
+        orders = query.order_by(Order.created_at, Order.id).limit(limit + 1).all()
+        if not orders:
+            return {"code": 404, "message": "No paid orders in this range", "status": 0}, 404
+        if len(orders) > limit:
+            return {
+                "code": 400,
+                "message": f"More than {limit} invoices in this range; narrow it with from/to",
+                "status": 0
+            }, 400
+
+        paths, missing = invoice_paths(orders)
+        if missing:
+            return invoices_pending_response(missing)
+
+        entries = [(f"invoice_order_{order.id}.pdf", paths[order.id][1]) for order in orders]
+        response = Response(
+            stream_zip(entries, concurrency=current_app.config["BUNDLE_FETCH_CONCURRENCY"]),
+            mimetype="application/zip",
+            direct_passthrough=True
+        )
+        response.headers["Content-Disposition"] = content_disposition(f"invoices_{datetime.utcnow():%Y%m%d}.zip")
+        return response
 
 class BuyerCancelOrderResource(Resource):
     @token_required
@@ -218,6 +241,7 @@ class BuyerCancelOrderResource(Resource):
 
         try:
             order.status = 'cancelled'
+            record_order_event(order, "order.cancelled")
             
             CartItem.query.filter_by(buyer_id=user_id).delete()
 
@@ -247,6 +271,7 @@ class BuyerCancelPendingOrderResource(Resource):
 
         try:
             pending_order.status = 'cancelled'
+            record_order_event(pending_order, "order.cancelled")
             db.session.commit()
             return {
                 "code": 200,
@@ -311,9 +336,21 @@ class BuyerRetryCheckoutResource(Resource):
         if not seller or not seller.stripe_account_id:
             return {"code": 400, "message": "Seller does not have a valid Stripe account", "status": 0}, 400
 
+        # The sweeper expires pending orders by created_at, so a restarted checkout
+        # restarts the clock; conditional so an order expired meanwhile isn't revived
+        restarted = db.session.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status == "pending")
+            .values(created_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.session.commit()
+        if not restarted:
+            return {"code": 404, "message": "Pending order not found", "status": 0}, 404
+
         try:
             # Create a new Stripe checkout session
-            session = stripe.checkout.Session.create(
+            session = payment_client().create_checkout_session(
                 payment_method_types=["card"],
                 line_items=line_items,
                 mode="payment",
@@ -329,6 +366,7 @@ class BuyerRetryCheckoutResource(Resource):
 
             # Update the order with the new Stripe session ID
             order.stripe_payment_id = session.id
+            record_order_event(order, "order.checkout_restarted", stripe_session_id=session.id)
             db.session.commit()
 
             return {
@@ -1,8 +1,12 @@
-from flask import request
+from flask import request, send_file, current_app
 from flask_restful import Resource
 from main.database.models import Product, Coupon
 from main.extension import db
+from main.common.disk_cache import app_cache
+from main.common.storage import local_path
+from main.common.audio_preview_generator import generate_clip, parse_duration
 from datetime import datetime
+import threading
 
 class ProductListResource(Resource):
     def get(self):
@@ -95,3 +99,82 @@ class ProductDetailResource(Resource):
         }
 
         return {"code": 200, "status": 1, "data": data}, 200
+
+def get_clip_cache():
+    return app_cache(
+        "clip_cache",
+        current_app.config["CLIP_CACHE_DIR"],
+        current_app.config["CLIP_CACHE_MAX_BYTES"],
+        suffix=".mp3"
+    )
+
+
+def clip_slots():
+    """Per-app semaphore bounding concurrent clip generations, created on first use."""
+    slots = current_app.extensions.get("clip_slots")
+    if slots is None:
+        slots = current_app.extensions["clip_slots"] = threading.BoundedSemaphore(
+            current_app.config["CLIP_MAX_CONCURRENT"]
+        )
+    return slots
+
+
+class ProductClipResource(Resource):
+    def get(self, product_id):
+        product = Product.query.filter_by(id=product_id, is_deleted=False).first()
+        if not product or not product.file_url:
+            return {"code": 404, "message": "Product not found", "status": 0}, 404
+
+        lengths = current_app.config["CLIP_LENGTHS"]
+        max_len = max(lengths)
+        try:
+            start = int(request.args.get("start", 0))
+            length = int(request.args.get("len", max_len))
+        except ValueError:
+            return {"code": 400, "message": "start and len must be whole seconds", "status": 0}, 400
+
+        if start < 0 or not 1 <= length <= max_len:
+            return {"code": 400, "message": f"start must be >= 0 and len between 1 and {max_len}", "status": 0}, 400
+
+        # Snap to a small grid so anonymous callers can't ask for an unbounded
+        # number of distinct clips, each its own ffmpeg run
+        step = current_app.config["CLIP_START_STEP"]
+        start -= start % step
+        length = min(n for n in lengths if n >= length)
+
+        track_seconds = parse_duration(product.duration)
+        if track_seconds is not None and start >= track_seconds:
+            return {"code": 400, "message": "start is beyond the end of the track", "status": 0}, 400
+
+        # file_url is part of the key so replacing the audio invalidates old clips
+        key = f"{product.id}:{start}:{length}:{product.file_url}"
+        cache = get_clip_cache()
+        for _ in range(2):
+            path = cache.get(key)
+            if path is None:
+                slots = clip_slots()
+                if not slots.acquire(timeout=current_app.config["CLIP_QUEUE_TIMEOUT"]):
+                    return {
+                        "code": 429,
+                        "message": "Too many clips being generated, please retry shortly",
+                        "status": 0
+                    }, 429, {"Retry-After": str(current_app.config["CLIP_RETRY_AFTER"])}
+                try:
+                    path = cache.get_or_create(
+                        key,
+                        lambda tmp_path: generate_clip(
+                            local_path(product.file_url) or product.file_url, tmp_path, start, length,
+                            current_app.config["CLIP_BITRATE"]
+                        )
+                    )
+                except Exception as e:
+                    return {"code": 500, "message": f"Failed to generate clip: {str(e)}", "status": 0}, 500
+                finally:
+                    slots.release()
+
+            try:
+                return send_file(path, mimetype="audio/mpeg", conditional=True, max_age=86400)
+            except FileNotFoundError:
+                continue  # another worker evicted it after the lookup; generate it again
+
+        return {"code": 500, "message": "Failed to generate clip", "status": 0}, 500
@@ -26,7 +26,7 @@ class SellerDashboardResource(Resource):
                 .join(Product, Product.id == OrderItem.product_id)
                 .join(Order, Order.id == OrderItem.order_id)
                 .filter(
-                    Product.seller_id == user_id,
+                    OrderItem.seller_id == user_id,
                     Product.is_deleted == False,
                     Order.status == "paid"
                 )
@@ -49,36 +49,36 @@ class SellerDashboardResource(Resource):
                 .scalar() or 0.0, 2
             )
 
-            # Recent product sales (from paid orders and non-deleted products)
-            order_items = (
-                db.session.query(OrderItem)
+            # Recent product sales (from paid orders and non-deleted products):
+            # the 5 most recently sold products with their all-time totals, grouped in SQL
+            recent_rows = (
+                db.session.query(
+                    OrderItem.product_id,
+                    Product.title,
+                    func.sum(OrderItem.quantity).label("units_sold"),
+                    func.sum(OrderItem.price * OrderItem.quantity).label("revenue")
+                )
                 .join(Order, Order.id == OrderItem.order_id)
                 .join(Product, Product.id == OrderItem.product_id)
                 .filter(
-                    Product.seller_id == user_id,
+                    OrderItem.seller_id == user_id,
                     Product.is_deleted == False,
                     Order.status == "paid"
                 )
-                .order_by(Order.created_at.desc())
+                .group_by(OrderItem.product_id, Product.title)
+                .order_by(func.max(Order.created_at).desc())
+                .limit(5)
                 .all()
             )
 
-            recent_sales = {}
-            for item in order_items:
-                pid = item.product_id
-                if pid not in recent_sales and len(recent_sales) < 5:
-                    recent_sales[pid] = {
-                        "product_id": pid,
-                        "title": item.product.title,
-                        "units_sold": 0,
-                        "revenue": 0.0,
-                    }
-                if pid in recent_sales:
-                    recent_sales[pid]["units_sold"] += item.quantity
-                    recent_sales[pid]["revenue"] += item.price * item.quantity
-
-            for sale in recent_sales.values():
-                sale["revenue"] = round(sale["revenue"], 2)
+            recent_sales = {
+                row.product_id: {
+                    "product_id": row.product_id,
+                    "title": row.title,
+                    "units_sold": int(row.units_sold or 0),
+                    "revenue": round(float(row.revenue or 0.0), 2),
+                } for row in recent_rows
+            }
 
             return {
                 "code": 200,
@@ -1,57 +1,126 @@
+from datetime import datetime, timedelta
 from flask_restful import Resource
 from flask import request
+from sqlalchemy import func
 from main.database.models import Order, OrderItem, Product, User
 from main.extension import db
 from main.common.jwt_utils import token_required
 
+MAX_ORDERS_PER_PAGE = 100
+
+
+def parse_date(value, field):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{field} must be a date in YYYY-MM-DD format")
+
+
+def seller_items(seller_id):
+    """Paid order items of seller_id's products, found by order_items.seller_id."""
+    return (
+        db.session.query(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(OrderItem.seller_id == seller_id, Order.status == "paid")
+    )
+
+
+def load_seller_products(seller_id, order_ids):
+    """The seller's line items for these orders with product titles, in one query, keyed by order id."""
+    products = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return products
+    rows = (
+        seller_items(seller_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .filter(OrderItem.order_id.in_(order_ids))
+        .with_entities(OrderItem.order_id, Product.id, Product.title, OrderItem.price, OrderItem.quantity)
+        .order_by(OrderItem.id)
+        .all()
+    )
+    for order_id, product_id, title, price, quantity in rows:
+        products[order_id].append({
+            "product_id": product_id,
+            "title": title,
+            "price": price,
+            "quantity": quantity
+        })
+    return products
+
+
+def approved_seller(user_id):
+    seller = User.query.filter_by(id=user_id, role='seller').first()
+    return seller if seller and seller.is_approved else None
+
+
 class SellerOrdersResource(Resource):
     @token_required
     def get(self, user_id, role):
         if role != "seller":
             return {"code": 403, "message": "Unauthorized - seller access only", "status": 0}, 403
 
-        seller = User.query.filter_by(id=user_id, role='seller').first()
-        if not seller or not seller.is_approved:
+        if not approved_seller(user_id):
             return {"code": 403, "message": "Seller is not approved by admin", "status": 0}, 403
-        
-        seller_products = Product.query.filter_by(seller_id=user_id).all()
-        product_ids = [p.id for p in seller_products]
-
-        order_items = (
-            OrderItem.query
-            .join(Order, Order.id == OrderItem.order_id)
-            .filter(OrderItem.product_id.in_(product_ids), Order.status == "paid")
-            .all()
+
+        # Pagination is opt-in so existing clients still get every order
+        page = request.args.get("page", type=int)
+        per_page = max(1, min(request.args.get("per_page", 20, type=int), MAX_ORDERS_PER_PAGE))
+
+        # One row per order, grouped in SQL, with the seller's share of it
+        query = (
+            seller_items(user_id)
+            .join(User, User.id == Order.buyer_id)
+            .with_entities(
+                Order.id.label("order_id"),
+                Order.created_at,
+                Order.total_price,
+                User.name.label("buyer_name"),
+                User.email.label("buyer_email"),
+                func.sum(OrderItem.price * OrderItem.quantity).label("seller_total")
+            )
+            .group_by(Order.id, Order.created_at, Order.total_price, User.name, User.email)
+            .order_by(Order.created_at.desc(), Order.id.desc())
         )
+        try:
+            if request.args.get("from"):
+                query = query.filter(Order.created_at >= parse_date(request.args["from"], "from"))
+            if request.args.get("to"):
+                # Inclusive of the whole "to" day
+                query = query.filter(Order.created_at < parse_date(request.args["to"], "to") + timedelta(days=1))
+        except ValueError as e:
+            return {"code": 400, "message": str(e), "status": 0}, 400
 
-        orders_dict = {}
-        for item in order_items:
-            order_id = item.order_id
-            if order_id not in orders_dict:
-                order = item.order
-                buyer = order.buyer
-                orders_dict[order_id] = {
-                    "order_id": order.id,
-                    "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "total_price": order.total_price,
-                    "buyer_name": buyer.name,
-                    "buyer_email": buyer.email,
-                    "products": []
-                }
-            product = item.product
-            orders_dict[order_id]["products"].append({
-                "product_id": product.id,
-                "title": product.title,
-                "price": item.price,
-                "quantity": item.quantity
-            })
+        if page:
+            paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+            rows = paginated.items
+        else:
+            rows = query.all()
 
-        return {
+        products = load_seller_products(user_id, [row.order_id for row in rows])
+        data = [{
+            "order_id": row.order_id,
+            "created_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "total_price": row.total_price,
+            "seller_total": round(float(row.seller_total or 0.0), 2),
+            "buyer_name": row.buyer_name,
+            "buyer_email": row.buyer_email,
+            "products": products[row.order_id]
+        } for row in rows]
+
+        result = {
             "code": 200,
-            "data": list(orders_dict.values()),
+            "data": data,
             "message": "Seller order list fetched successfully",
             "status": 1
-        }, 200
+        }
+        if page:
+            result["pagination"] = {
+                "page": paginated.page,
+                "per_page": paginated.per_page,
+                "total_pages": paginated.pages,
+                "total_items": paginated.total
+            }
+        return result, 200
 
 
 class SellerOrderDetailResource(Resource):
@@ -59,45 +128,43 @@ class SellerOrderDetailResource(Resource):
     def get(self, user_id, role, order_id):
         if role != "seller":
             return {"code": 403, "message": "Unauthorized - seller access only", "status": 0}, 403
-        
-        seller = User.query.filter_by(id=user_id, role='seller').first()
-        if not seller or not seller.is_approved:
+
+        if not approved_seller(user_id):
             return {"code": 403, "message": "Seller is not approved by admin", "status": 0}, 403
-        
-        seller_products = Product.query.filter_by(seller_id=user_id).all()
-        product_ids = [p.id for p in seller_products]
-
-        order_items = (
-            OrderItem.query
-            .join(Order, Order.id == OrderItem.order_id)
-            .filter(OrderItem.order_id == order_id, OrderItem.product_id.in_(product_ids), Order.status == "paid")
+
+        # Order, buyer and the seller's items in one query
+        rows = (
+            seller_items(user_id)
+            .join(User, User.id == Order.buyer_id)
+            .join(Product, Product.id == OrderItem.product_id)
+            .filter(OrderItem.order_id == order_id)
+            .with_entities(
+                Order.id, Order.created_at, Order.total_price, User.name, User.email,
+                Product.id, Product.title, OrderItem.price, OrderItem.quantity
+            )
+            .order_by(OrderItem.id)
             .all()
         )
 
-        if not order_items:
+        if not rows:
             return {"code": 404, "message": "No matching items found for this order", "status": 0}, 404
 
-        order = order_items[0].order
-        buyer = order.buyer
-
-        products_data = []
-        for item in order_items:
-            product = item.product
-            products_data.append({
-                "product_id": product.id,
-                "title": product.title,
-                "price": item.price,
-                "quantity": item.quantity
-            })
+        order_id, created_at, total_price, buyer_name, buyer_email = rows[0][:5]
+        products_data = [{
+            "product_id": product_id,
+            "title": title,
+            "price": price,
+            "quantity": quantity
+        } for *_, product_id, title, price, quantity in rows]
 
         return {
             "code": 200,
             "data": {
-                "order_id": order.id,
-                "created_at": order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "total_price": order.total_price,
-                "buyer_name": buyer.name,
-                "buyer_email": buyer.email,
+                "order_id": order_id,
+                "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "total_price": total_price,
+                "buyer_name": buyer_name,
+                "buyer_email": buyer_email,
                 "products": products_data
             },
             "message": "Seller order details fetched successfully",
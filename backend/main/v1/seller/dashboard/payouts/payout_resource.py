@@ -1,12 +1,9 @@
 from flask_restful import Resource
 from flask import request
 from datetime import datetime
-from main.database.models import db, Order, Product, Payout
+from main.database.models import db, Order, Payout
 from main.common.jwt_utils import token_required
-import stripe
-import os
-
-stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
+from main.common.payments import payment_client
 
 class RecordPayoutResource(Resource):
     def post(self):
@@ -16,9 +13,9 @@ class RecordPayoutResource(Resource):
             return {"code": 400, "message": "Missing session_id", "status": 0}, 400
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = payment_client().retrieve_checkout_session(session_id)
         except Exception as e:
-            return {"code": 500, "message": f"Stripe error: {str(e)}", "status": 0}, 500
+            return {"code": 500, "message": f"Payment provider error: {str(e)}", "status": 0}, 500
 
         if session.payment_status != "paid":
             return {"code": 400, "message": "Payment not completed", "status": 0}, 400
@@ -37,11 +34,7 @@ class RecordPayoutResource(Resource):
         seller_earnings = {}
 
         for item in order.items:
-            product = Product.query.get(item.product_id)
-            if not product:
-                continue
-            seller_id = product.seller_id
-            seller_earnings[seller_id] = seller_earnings.get(seller_id, 0) + item.price
+            seller_earnings[item.seller_id] = seller_earnings.get(item.seller_id, 0) + item.price
 
         created_payouts = []
         for seller_id, gross_amount in seller_earnings.items():
@@ -1,13 +1,71 @@
 import os
 import tempfile
-from flask import request
+from flask import request, current_app
 from flask_restful import Resource
 from werkzeug.utils import secure_filename
 from main.common.jwt_utils import token_required
-from main.common.cloudinary_helper import upload_to_cloudinary
-from main.common.audio_preview_generator import generate_30s_preview, detect_audio_format, detect_audio_duration, detect_bpm
+from main.common.storage import upload_file
+from main.common.lossless import wav_to_flac
+from main.common.audio_preview_generator import generate_30s_preview, generate_30s_preview_piped, detect_audio_format
 from main.database.models import db, Product, User
 
+
+def store_master(source, filename=None):
+    """Upload the original, as FLAC when it is a WAV that FLAC holds bit-exactly; returns its URL."""
+    flac_path = wav_to_flac(source)
+    if not flac_path:
+        return upload_file(source, filename=filename)
+    try:
+        name = os.path.splitext(filename)[0] if filename else "master"
+        return upload_file(flac_path, filename=f"{name}.flac")
+    finally:
+        os.remove(flac_path)
+
+
+def process_audio_upload(file):
+    """Generate the preview, store original + preview and return the product audio fields.
+
+    Returns None if the preview could not be generated. Uses the temp-file or
+    piped pipeline depending on AUDIO_PIPELINE_MODE; temporaries are always cleaned up.
+    """
+    if current_app.config.get("AUDIO_PIPELINE_MODE") == "pipe":
+        source, preview, duration, bpm = generate_30s_preview_piped(file, current_app.config["AUDIO_SPOOL_MAX_BYTES"])
+        if source is None:
+            return None
+        try:
+            name, _ = os.path.splitext(file.filename)
+            audio_format = detect_audio_format(source)
+            return {
+                "file_url": store_master(source, filename=file.filename),
+                "preview_url": upload_file(preview, folder="previews", filename=f"{name}_preview.mp3"),
+                "audio_format": audio_format,
+                "original_format": audio_format,
+                "duration": duration,
+                "bpm": bpm,
+            }
+        finally:
+            source.close()
+            preview.close()
+
+    temp_input_path, preview_path, duration, bpm = generate_30s_preview(file)
+    try:
+        if not temp_input_path or not preview_path:
+            return None
+        audio_format = detect_audio_format(temp_input_path)
+        return {
+            "file_url": store_master(temp_input_path),
+            "preview_url": upload_file(preview_path, folder="previews"),
+            "audio_format": audio_format,
+            "original_format": audio_format,
+            "duration": duration,
+            "bpm": bpm,
+        }
+    finally:
+        for path in [temp_input_path, preview_path]:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
 class UploadProductResource(Resource):
     @token_required
     def post(self, user_id, role):
@@ -41,31 +99,25 @@ class UploadProductResource(Resource):
         file.filename = secure_filename(file.filename)
         is_featured = request.form.get("is_featured", "false").lower() == "true"
 
-        temp_input_path = None
-        preview_path = None
-
         try:
-            temp_input_path, preview_path, duration, bpm = generate_30s_preview(file)
+            audio = process_audio_upload(file)
 
-            if not temp_input_path or not preview_path or not duration:
+            if not audio or not audio["duration"]:
                 return {"code": 500, "message": "Failed to generate preview or detect duration", "status": 0}, 500
 
-            uploaded_url = upload_to_cloudinary(temp_input_path)
-            preview_url = upload_to_cloudinary(preview_path)
-            audio_format = detect_audio_format(temp_input_path)
-
             product = Product(
                 title=title,
                 description=description,
                 price=price,
-                file_url=uploaded_url,
-                preview_url=preview_url,
+                file_url=audio["file_url"],
+                preview_url=audio["preview_url"],
                 preview_image_url=request.form.get("preview_image_url"),
                 category=request.form.get("category"),
                 genre=request.form.get("genre"),
-                duration=duration,
-                audio_format=audio_format,
-                bpm=bpm,
+                duration=audio["duration"],
+                audio_format=audio["audio_format"],
+                original_format=audio["original_format"],
+                bpm=audio["bpm"],
                 license_type=request.form.get("license_type"),
                 is_featured=is_featured,
                 seller_id=user_id,
@@ -90,11 +142,6 @@ class UploadProductResource(Resource):
                 "status": 0
             }, 500
 
-        finally:
-            for path in [temp_input_path, preview_path]:
-                if path and os.path.exists(path):
-                    os.remove(path)
-
 class SellerProductListResource(Resource):
     @token_required
     def get(self, user_id, role):
@@ -177,30 +224,28 @@ class ProductUpdateResource(Resource):
             data = request.form
             file = request.files.get("file")
 
-        temp_input_path = None
-        preview_path = None
-
         try:
             if file:
+                # API-only workers keep the audio stack out; metadata edits still work there
+                if current_app.config.get("APP_PROFILE") == "api":
+                    return {"code": 503, "message": "Audio uploads are not handled by this server", "status": 0}, 503
+
                 if not file.filename.lower().endswith(('.mp3', '.wav', '.ogg')):
                     return {"code": 400, "message": "Invalid audio file format", "status": 0}, 400
 
                 file.filename = secure_filename(file.filename)
-                temp_input_path, preview_path = generate_30s_preview(file)
+                audio = process_audio_upload(file)
 
-                if not temp_input_path or not preview_path:
+                if not audio:
                     return {"code": 500, "message": "Failed to generate audio preview", "status": 0}, 500
 
-                audio_format = detect_audio_format(temp_input_path)
-                duration = detect_audio_duration(temp_input_path)
-                bpm = detect_bpm(temp_input_path)
-
-                product.audio_format = audio_format
-                product.duration = duration
-                product.bpm = bpm
+                product.audio_format = audio["audio_format"]
+                product.original_format = audio["original_format"]
+                product.duration = audio["duration"]
+                product.bpm = audio["bpm"]
                 
-                product.file_url = upload_to_cloudinary(temp_input_path)
-                product.preview_url = upload_to_cloudinary(preview_path)
+                product.file_url = audio["file_url"]
+                product.preview_url = audio["preview_url"]
 
             updatable_fields = [
                 "title", "description", "category", "preview_image_url",
@@ -229,11 +274,6 @@ class ProductUpdateResource(Resource):
             db.session.rollback()
             return {"code": 500, "message": f"Update failed: {str(e)}", "status": 0}, 500
 
-        finally:
-            for path in [temp_input_path, preview_path]:
-                if path and os.path.exists(path):
-                    os.remove(path)
-
 class ProductDeleteResource(Resource):
     @token_required
     def delete(self, user_id, role, product_id):
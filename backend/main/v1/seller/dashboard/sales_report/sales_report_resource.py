@@ -23,7 +23,7 @@ class SellerAllSalesResource(Resource):
             .join(Product, Product.id == OrderItem.product_id)
             .join(Order, Order.id == OrderItem.order_id)
             .filter(
-                Product.seller_id == user_id,
+                OrderItem.seller_id == user_id,
                 Product.is_deleted == False,
                 Order.status == "paid"
             )
@@ -63,17 +63,16 @@ class SellerProductSalesResource(Resource):
         if not product:
             return {"code": 404, "message": "Product not found or unauthorized", "status": 0}, 404
 
+        # The product was checked above, so the items need no join back to products
         result = (
             db.session.query(
                 func.sum(OrderItem.quantity).label("total_units_sold"),
                 func.sum(OrderItem.price * OrderItem.quantity).label("total_earned")
             )
-            .join(OrderItem, OrderItem.product_id == Product.id)
             .join(Order, Order.id == OrderItem.order_id)
             .filter(
-                Product.id == product_id,
-                Product.seller_id == user_id,
-                Product.is_deleted == False,
+                OrderItem.seller_id == user_id,
+                OrderItem.product_id == product_id,
                 Order.status == "paid"
             )
             .first()
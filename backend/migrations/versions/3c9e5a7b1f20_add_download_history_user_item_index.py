@@ -0,0 +1,26 @@
+"""Add (user_id, order_item_id) index to download_history
+
+Revision ID: 3c9e5a7b1f20
+Revises: d9a36aacacb1
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5a7b1f20'
+down_revision = 'd9a36aacacb1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.create_index('ix_download_history_user_item', ['user_id', 'order_item_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_download_history_user_item')
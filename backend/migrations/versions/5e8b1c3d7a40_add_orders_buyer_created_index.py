@@ -0,0 +1,26 @@
+"""Add (buyer_id, created_at, id) index to orders
+
+Revision ID: 5e8b1c3d7a40
+Revises: 4a6c0e8d2f17
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b1c3d7a40'
+down_revision = '4a6c0e8d2f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_buyer_created', ['buyer_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_buyer_created')
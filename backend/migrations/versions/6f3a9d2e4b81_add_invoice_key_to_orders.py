@@ -0,0 +1,26 @@
+"""Add invoice_key to orders
+
+Revision ID: 6f3a9d2e4b81
+Revises: 5e8b1c3d7a40
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f3a9d2e4b81'
+down_revision = '5e8b1c3d7a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invoice_key', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('invoice_key')
@@ -0,0 +1,32 @@
+"""Add download_count counter to order_items
+
+Revision ID: 8f2d6c41a9b3
+Revises: 3c9e5a7b1f20
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d6c41a9b3'
+down_revision = '3c9e5a7b1f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('download_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the audit log
+    op.execute(
+        "UPDATE order_items SET download_count = "
+        "(SELECT COUNT(*) FROM download_history WHERE download_history.order_item_id = order_items.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_column('download_count')
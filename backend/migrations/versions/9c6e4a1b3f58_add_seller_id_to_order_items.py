@@ -0,0 +1,47 @@
+"""Add seller_id to order_items
+
+Revision ID: 9c6e4a1b3f58
+Revises: 8b5d3f0a2e47
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c6e4a1b3f58'
+down_revision = '8b5d3f0a2e47'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade():
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seller_id', sa.Integer(), nullable=True))
+
+    # Copy each item's product seller, in id ranges so no single UPDATE holds locks for long
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM order_items")).scalar() or 0
+    for start in range(0, max_id, BACKFILL_BATCH):
+        bind.execute(sa.text(
+            "UPDATE order_items SET seller_id = "
+            "(SELECT products.seller_id FROM products WHERE products.id = order_items.product_id) "
+            "WHERE order_items.id > :start AND order_items.id <= :end"
+        ), {"start": start, "end": start + BACKFILL_BATCH})
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.alter_column('seller_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_order_items_seller_id_users', 'users', ['seller_id'], ['id'])
+        batch_op.create_index('ix_order_items_seller_order', ['seller_id', 'order_id'], unique=False)
+        batch_op.create_index('ix_order_items_seller_product', ['seller_id', 'product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_items_seller_product')
+        batch_op.drop_index('ix_order_items_seller_order')
+        batch_op.drop_constraint('fk_order_items_seller_id_users', type_='foreignkey')
+        batch_op.drop_column('seller_id')
@@ -0,0 +1,26 @@
+"""Add resume_count to download_history
+
+Revision ID: a2d8f6c4e019
+Revises: 9c6e4a1b3f58
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2d8f6c4e019'
+down_revision = '9c6e4a1b3f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('resume_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('download_history', schema=None) as batch_op:
+        batch_op.drop_column('resume_count')
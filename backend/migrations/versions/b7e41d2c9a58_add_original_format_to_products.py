@@ -0,0 +1,32 @@
+"""Add original_format to products
+
+Revision ID: b7e41d2c9a58
+Revises: 8f2d6c41a9b3
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41d2c9a58'
+down_revision = '8f2d6c41a9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('original_format', sa.String(length=20), nullable=True))
+
+    # Everything uploaded so far is stored in the format it was uploaded in
+    op.execute(
+        "UPDATE products SET original_format = LOWER(audio_format) "
+        "WHERE audio_format IS NOT NULL AND audio_format != 'unknown'"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('original_format')
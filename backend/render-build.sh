@@ -3,5 +3,9 @@
 # Install ffmpeg on the fly
 apt-get update && apt-get install -y ffmpeg
 
+# Payment webhooks, the order outbox and expiry sweeps run in one worker
+# process next to the web server (web processes leave them off)
+python worker.py &
+
 # Then start the app (gunicorn or whatever you're using)
 gunicorn wsgi:app --bind 0.0.0.0:$PORT
@@ -0,0 +1,26 @@
+"""Background worker: payment webhooks, the order outbox relay and the pending-order sweeper.
+
+Web processes don't run these by default (WEBHOOK_CONSUMER, OUTBOX_RELAY and
+ORDER_SWEEPER are 'off'), so run exactly one of these next to gunicorn;
+render-build.sh starts it before the web server. Locally:
+
+    python worker.py
+"""
+from main import create_app
+from main.common.stripe.webhook_events import start_webhook_consumer
+from main.common.outbox import start_outbox_relay
+from main.common.order_expiry import start_order_sweeper
+
+app = create_app()
+
+if __name__ == "__main__":
+    # Jobs set to 'thread' were already started by create_app()
+    jobs = {
+        "WEBHOOK_CONSUMER": start_webhook_consumer,
+        "OUTBOX_RELAY": start_outbox_relay,
+        "ORDER_SWEEPER": start_order_sweeper,
+    }
+    threads = [start(app) for setting, start in jobs.items() if app.config[setting] != "thread"]
+    print("Worker running:", ", ".join(thread.name for thread in threads))
+    for thread in threads:
+        thread.join()